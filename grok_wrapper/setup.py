@@ -24,6 +24,12 @@ setup(
         "rich>=13.0.0",
         "playwright>=1.40.0",
     ],
+    extras_require={
+        # Faster JSON for chat requests and response streams
+        "orjson": ["orjson>=3.9.0"],
+        # HTTP/2 backend for GrokClient(http2=True)
+        "http2": ["httpx[http2]>=0.25.0"],
+    },
     entry_points={
         "console_scripts": [
             "grok=src.interfaces.cli:main",
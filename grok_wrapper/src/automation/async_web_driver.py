@@ -0,0 +1,293 @@
+"""
+Asyncio browser automation for Grok.com using Playwright's async API
+One driver can run several chats at once, one tab each, without a thread per chat
+"""
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from .driver_config import (
+    BASE_CONTEXT_OPTIONS,
+    BLOCKED_RESOURCE_TYPES,
+    BLOCKED_RESOURCE_URL_RE,
+    CHAT_INPUT_SELECTOR,
+    DEEPSEARCH_ENABLED_PREDICATE_JS,
+    GROK_MODEL_NAMES,
+    MODEL_TEXT_MAP,
+    STEALTH_HEADERS,
+    STEALTH_INIT_SCRIPT,
+    STEALTH_USER_AGENT,
+    build_cookie_list,
+    build_launch_options,
+    filter_response_text,
+    model_text_matches,
+)
+from .js_api import evaluate_js_api_async, register_automation_helpers_async
+from .js_utils import STOP_BUTTON_SELECTOR, wait_for_dom_predicate_js
+
+logger = logging.getLogger(__name__)
+
+ASYNC_PLAYWRIGHT_AVAILABLE = False
+if TYPE_CHECKING:
+    from playwright.async_api import Browser, BrowserContext, Page, Playwright
+
+try:
+    from playwright.async_api import (
+        Browser,
+        BrowserContext,
+        Page,
+        Playwright,
+        TimeoutError as PlaywrightTimeoutError,
+        async_playwright,
+    )
+    ASYNC_PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    ASYNC_PLAYWRIGHT_AVAILABLE = False
+
+
+async def _abort_blocked_resource(route: Any) -> None:
+    """Route handler: abort matched images/fonts/media, let anything else through"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+class AsyncGrokWebDriver:
+    """
+    Async counterpart of GrokWebDriver for running chats concurrently.
+
+    Waiting for a response awaits Playwright instead of blocking the thread,
+    so several chats (one page each, from new_chat_page()) can be driven from
+    one event loop with asyncio.gather().
+    """
+
+    def __init__(
+        self,
+        headless: bool = False,
+        stealth_mode: bool = True,
+        debug_mode: bool = False,
+        block_resources: bool = False,
+    ):
+        if not ASYNC_PLAYWRIGHT_AVAILABLE:
+            raise ImportError(
+                "Playwright is not installed. Install it with: pip install playwright && playwright install chromium"
+            )
+
+        self.headless = headless
+        self.stealth_mode = stealth_mode
+        self.debug_mode = debug_mode
+        # Opt-in: abort image/font/media downloads the automation never looks
+        # at. Any context.route() makes Playwright bypass the HTTP cache, so
+        # Grok's JS/CSS bundles are then fetched again on every navigation
+        self.block_resources = block_resources
+        self.playwright: Optional[Playwright] = None
+        self.browser: Optional[Browser] = None
+        self.context: Optional[BrowserContext] = None
+        self._cookies: Optional[Dict[str, str]] = None
+
+    def set_cookies(self, cookies: Dict[str, str]) -> None:
+        """Store cookies to be injected when the context is created"""
+        self._cookies = cookies
+
+    async def start(self) -> None:
+        """Launch Chrome and create the shared browser context"""
+        logger.debug("🚀 Starting browser (async)...")
+        self.playwright = await async_playwright().start()
+        try:
+            launch_options = build_launch_options(self.headless)
+            self.browser = await self.playwright.chromium.launch(**launch_options)
+
+            context_options: Dict[str, Any] = dict(BASE_CONTEXT_OPTIONS)
+            if self.stealth_mode:
+                context_options["extra_http_headers"] = dict(STEALTH_HEADERS)
+                context_options["user_agent"] = STEALTH_USER_AGENT
+            self.context = await self.browser.new_context(**context_options)
+
+            if self.stealth_mode:
+                await self.context.add_init_script(STEALTH_INIT_SCRIPT)
+            if self.block_resources:
+                await self.context.route(BLOCKED_RESOURCE_URL_RE, _abort_blocked_resource)
+            await register_automation_helpers_async(self.context)
+
+            if self._cookies:
+                cookies_list = build_cookie_list(self._cookies)
+                if cookies_list:
+                    try:
+                        await self.context.add_cookies(cookies_list)  # type: ignore
+                        logger.debug(f"✓ Injected {len(cookies_list)} cookies into context")
+                    except Exception as e:
+                        logger.warning(f"Failed to inject cookies: {e}")
+        except BaseException:
+            # Don't leave the Playwright driver process (or a half-built browser) running
+            await self.close()
+            raise
+
+    @staticmethod
+    async def _wait_for_dom_predicate(page: Page, js_predicate: str, timeout_ms: int = 800) -> bool:
+        """Wait in the page until a JS predicate holds (async GrokWebDriver._wait_for_dom_predicate)"""
+        return bool(await page.evaluate(wait_for_dom_predicate_js(js_predicate), [timeout_ms, None]))
+
+    async def new_chat_page(self) -> Page:
+        """
+        Open a tab on grok.com for one chat.
+
+        Returns:
+            New page (close it with await page.close() when done)
+        """
+        if not self.context:
+            raise Exception("Browser not started")
+        page = await self.context.new_page()
+        await page.goto("https://grok.com", wait_until="commit", timeout=5000)
+        try:
+            popup_result = await evaluate_js_api_async(page, 'closePopups') or {}
+        except Exception as e:
+            # A redirect can replace the document right after commit
+            logger.debug(f"Could not close popups: {e}")
+            popup_result = {}
+        if popup_result.get('closed'):
+            logger.info(f"✓ Closed popup using: {', '.join(popup_result.get('methods', ()))}")
+        return page
+
+    async def configure_session(
+        self,
+        page: Page,
+        model: Optional[str] = None,
+        deepsearch: bool = False,
+        private: bool = False
+    ) -> Dict[str, bool]:
+        """
+        Apply model, DeepSearch and Private mode settings on a page.
+
+        Args:
+            page: Page from new_chat_page()
+            model: Model name (e.g. "grok-4.1", "expert"), or None to leave it
+            deepsearch: Enable DeepSearch
+            private: Enable Private mode
+
+        Returns:
+            Dictionary of setting name -> whether it is in effect
+        """
+        state = await evaluate_js_api_async(page, 'sessionState') or {}
+        results: Dict[str, bool] = {}
+
+        if model:
+            model_lower = model.lower().strip()
+            if model_text_matches(model_lower, (state.get('modelText') or '').lower()):
+                results['model'] = True
+            elif model_lower in GROK_MODEL_NAMES:
+                result = await evaluate_js_api_async(page, 'selectGrokModel', GROK_MODEL_NAMES[model_lower]) or {}
+                results['model'] = bool(result.get('selected'))
+            elif model_lower in MODEL_TEXT_MAP:
+                result = await evaluate_js_api_async(page, 'selectModelItem', MODEL_TEXT_MAP[model_lower]) or {}
+                results['model'] = bool(result.get('itemClicked'))
+            else:
+                logger.warning(f"Unknown model: {model}")
+                results['model'] = False
+
+        if deepsearch:
+            if (state.get('deepsearch') or {}).get('enabled'):
+                results['deepsearch'] = True
+            else:
+                result = await evaluate_js_api_async(page, 'clickDeepSearch') or {}
+                # Like the sync driver, only report it once the toggle shows as on
+                results['deepsearch'] = bool(result.get('clicked')) and await self._wait_for_dom_predicate(
+                    page, DEEPSEARCH_ENABLED_PREDICATE_JS
+                )
+
+        if private:
+            result = await evaluate_js_api_async(page, 'setPrivateMode', [True, 1000]) or {}
+            results['private'] = bool(result.get('ok'))
+
+        return results
+
+    async def send_message(self, page: Page, message: str, timeout: int = 120000) -> Optional[str]:
+        """
+        Enter and submit a message, then wait for the response.
+
+        Args:
+            page: Page from new_chat_page()
+            message: Message to send
+            timeout: Timeout in milliseconds
+
+        Returns:
+            Response text or None
+        """
+        chat_input = await page.query_selector(CHAT_INPUT_SELECTOR)
+        if not chat_input:
+            raise Exception("Could not find chat input. Make sure you're logged in and on the chat page.")
+
+        await chat_input.fill(message)
+        logger.debug("🔘 Submitting message...")
+        try:
+            await chat_input.press("Enter")
+        except Exception as e:
+            logger.warning(f"Could not submit message: {e}")
+            return None
+
+        return await self.wait_for_response(page, timeout, user_message=message)
+
+    async def _wait_for_stop_button(self, page: Page, visible: bool, deadline: float) -> bool:
+        """Await the stop generation button becoming visible (or gone) before the deadline"""
+        remaining_ms = (deadline - time.time()) * 1000
+        if remaining_ms <= 0:
+            return False
+        try:
+            await page.wait_for_selector(
+                STOP_BUTTON_SELECTOR,
+                state="visible" if visible else "hidden",
+                timeout=remaining_ms,
+            )
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    async def wait_for_response(self, page: Page, timeout: int = 120000, user_message: str = "") -> Optional[str]:
+        """
+        Wait for chat response using the stop generation button as indicator.
+        The button appears when generation starts and disappears when complete.
+        """
+        start_time = time.time()
+        deadline = start_time + timeout / 1000
+
+        try:
+            if not await self._wait_for_stop_button(page, True, deadline):
+                logger.warning("Generation button never appeared - response may have completed immediately")
+            if not await self._wait_for_stop_button(page, False, deadline):
+                logger.warning("Timeout waiting for generation to complete")
+
+            # Minimal wait for the DOM to settle after the button disappears
+            await asyncio.sleep(0.2)
+
+            response_text = await evaluate_js_api_async(page, 'extractResponse')
+            result = filter_response_text(response_text, user_message)
+
+            elapsed = time.time() - start_time
+            if result:
+                logger.debug("✓ Response extracted (%d chars, took %.1fs)", len(result), elapsed)
+            else:
+                logger.warning(f"✗ No response extracted (took {elapsed:.1f}s)")
+            return result
+
+        except Exception as e:
+            elapsed = time.time() - start_time
+            logger.warning(f"✗ Error waiting for response: {e} (took {elapsed:.1f}s)")
+            return None
+
+    async def close(self) -> None:
+        """Close the context, browser and Playwright"""
+        for closer, name in (
+            (self.context.close if self.context else None, "context"),
+            (self.browser.close if self.browser else None, "browser"),
+            (self.playwright.stop if self.playwright else None, "playwright"),
+        ):
+            if closer is None:
+                continue
+            try:
+                await closer()
+            except Exception as e:
+                logger.debug("Error closing %s: %s", name, e)
+        self.context = None
+        self.browser = None
+        self.playwright = None
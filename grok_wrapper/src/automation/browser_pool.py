@@ -0,0 +1,302 @@
+"""
+Shared Chrome instances for GrokWebDriver
+Launching Chrome dominates session start-up; drivers borrow a running browser
+from the pool and only create their own BrowserContext
+"""
+import atexit
+import json
+import logging
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from playwright.sync_api import Browser, Playwright
+
+logger = logging.getLogger(__name__)
+
+# Relaunch a browser after it has served this many contexts
+BROWSER_POOL_RECYCLE_AFTER = 100
+
+
+class _ThreadState:
+    """Playwright instance and browsers owned by one thread"""
+
+    def __init__(self) -> None:
+        self.thread_id = threading.get_ident()
+        # Idle browsers are kept for reuse on the main thread only; a worker
+        # thread's browsers close as soon as nothing borrows them
+        self.keep_idle = threading.current_thread() is threading.main_thread()
+        self.playwright: Optional["Playwright"] = None
+        # Outstanding acquire() / get_playwright() borrows
+        self.users = 0
+        # Launch options key -> browser handed out to new borrowers
+        self.browsers: Dict[str, "_PooledBrowser"] = {}
+        # id(browser) -> every browser of this thread not closed yet
+        self.owned: Dict[int, "_PooledBrowser"] = {}
+
+
+class _ThreadSlot:
+    """
+    Per-thread handle stored in a threading.local; it is dropped when the
+    thread finishes, which lets the pool clean up that thread's browsers
+    """
+
+    def __init__(self, state: _ThreadState):
+        self.state = state
+
+
+class _PooledBrowser:
+    """A launched browser plus its usage counters"""
+
+    def __init__(self, state: _ThreadState, key: str, browser: "Browser"):
+        self.state = state
+        self.key = key
+        self.browser = browser
+        self.active = 0
+        self.served = 0
+        self.retired = False
+
+
+class BrowserPool:
+    """
+    Hand out running browsers keyed by launch options.
+
+    Playwright's sync API is bound to the thread that started it, so each
+    thread gets its own Playwright instance and browsers, kept in a
+    threading.local (thread idents are reused after a thread exits, so they
+    cannot key the pool). The main thread keeps idle browsers for the next
+    driver; other threads close a browser when its last borrower releases it
+    and stop their Playwright once nothing is borrowed.
+    """
+
+    def __init__(self, recycle_after: int = BROWSER_POOL_RECYCLE_AFTER):
+        """
+        Initialize browser pool
+
+        Args:
+            recycle_after: Contexts a browser may serve before it is relaunched
+        """
+        self.recycle_after = recycle_after
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._by_browser: Dict[int, _PooledBrowser] = {}
+
+    def acquire(self, launch_options: Dict[str, Any]) -> Tuple["Playwright", "Browser"]:
+        """
+        Borrow a browser launched with the given options, launching it if needed.
+
+        Args:
+            launch_options: Keyword arguments for chromium.launch()
+
+        Returns:
+            (Playwright, Browser) pair; hand the browser back with release()
+        """
+        return self._acquire(
+            json.dumps(launch_options, sort_keys=True, default=str),
+            lambda playwright: playwright.chromium.launch(**launch_options),
+        )
+
+    def acquire_cdp(self, endpoint: str, timeout: float = 5000) -> Tuple["Playwright", "Browser"]:
+        """
+        Borrow a connection to an already running Chrome over CDP.
+
+        Args:
+            endpoint: CDP endpoint URL (e.g. http://localhost:9222)
+            timeout: Connection timeout in milliseconds
+
+        Returns:
+            (Playwright, Browser) pair; hand the browser back with release().
+            Closing a CDP browser only disconnects, the remote Chrome keeps running.
+        """
+        return self._acquire(
+            "cdp:" + endpoint,
+            lambda playwright: playwright.chromium.connect_over_cdp(endpoint, timeout=timeout),
+        )
+
+    def get_playwright(self) -> "Playwright":
+        """
+        Borrow this thread's Playwright instance, starting it if needed.
+
+        For browsers the pool cannot share (e.g. persistent profiles); hand it
+        back with release_playwright() once that browser is closed.
+        """
+        state = self._thread_state()
+        playwright = self._get_playwright(state)
+        with self._lock:
+            state.users += 1
+        return playwright
+
+    def release_playwright(self) -> None:
+        """Return a Playwright instance obtained from get_playwright()"""
+        slot = getattr(self._local, "slot", None)
+        if slot is None:
+            return
+        with self._lock:
+            slot.state.users = max(0, slot.state.users - 1)
+        self._stop_if_unused(slot.state)
+
+    def _thread_state(self) -> _ThreadState:
+        """This thread's state, created on first use"""
+        slot = getattr(self._local, "slot", None)
+        if slot is None:
+            state = _ThreadState()
+            slot = _ThreadSlot(state)
+            self._local.slot = slot
+            # Runs when the thread finishes and its threading.local is cleared;
+            # at interpreter exit the atexit close() handles the main thread
+            finalizer = weakref.finalize(slot, self._close_thread, state)
+            finalizer.atexit = False
+        return slot.state
+
+    @staticmethod
+    def _get_playwright(state: _ThreadState) -> "Playwright":
+        """Only called from the thread that owns state"""
+        from playwright.sync_api import sync_playwright
+
+        if state.playwright is None:
+            state.playwright = sync_playwright().start()
+        return state.playwright
+
+    def _acquire(
+        self, options_key: str, open_browser: Callable[["Playwright"], "Browser"]
+    ) -> Tuple["Playwright", "Browser"]:
+        state = self._thread_state()
+        playwright = self._get_playwright(state)
+        with self._lock:
+            entry = state.browsers.get(options_key)
+            if entry is not None and not entry.browser.is_connected():
+                logger.debug("Pooled browser disconnected, relaunching")
+                if entry.active:
+                    # Still counted for its borrowers until they release it
+                    entry.retired = True
+                    del state.browsers[options_key]
+                else:
+                    self._forget(entry)
+                entry = None
+            if entry is not None:
+                return playwright, self._lend(entry)
+
+        # Launch without the lock; only this thread uses state.browsers, so
+        # no other caller can launch the same browser meanwhile
+        try:
+            browser = open_browser(playwright)
+        except Exception:
+            self._stop_if_unused(state)
+            raise
+        with self._lock:
+            entry = _PooledBrowser(state, options_key, browser)
+            state.browsers[options_key] = entry
+            state.owned[id(browser)] = entry
+            self._by_browser[id(browser)] = entry
+            return playwright, self._lend(entry)
+
+    def _lend(self, entry: _PooledBrowser) -> "Browser":
+        """Count a new borrower of entry (caller holds the lock)"""
+        entry.active += 1
+        entry.served += 1
+        entry.state.users += 1
+        if entry.served >= self.recycle_after and not entry.retired:
+            # Current borrowers keep it; the next acquire launches a fresh one
+            entry.retired = True
+            if entry.state.browsers.get(entry.key) is entry:
+                del entry.state.browsers[entry.key]
+        return entry.browser
+
+    def release(self, browser: Optional["Browser"]) -> None:
+        """
+        Return a browser obtained from acquire().
+
+        Args:
+            browser: Browser to hand back (its contexts should already be closed)
+        """
+        if browser is None:
+            return
+        with self._lock:
+            entry = self._by_browser.get(id(browser))
+            if entry is None:
+                return
+            state = entry.state
+            entry.active = max(0, entry.active - 1)
+            state.users = max(0, state.users - 1)
+            close_browser = entry.active == 0 and (entry.retired or not state.keep_idle)
+            if close_browser:
+                self._forget(entry)
+        if close_browser:
+            if entry.retired:
+                logger.debug(f"Recycling browser after {entry.served} contexts")
+            # Playwright objects may only be used from the thread that created them
+            if state.thread_id == threading.get_ident():
+                self._close_browser(entry.browser)
+        self._stop_if_unused(state)
+
+    def close(self) -> None:
+        """
+        Close this thread's pooled browsers and stop its Playwright.
+
+        Playwright objects belong to the thread that started them, so other
+        threads' browsers are left to those threads (they are closed when
+        released or when the thread finishes).
+        """
+        slot = getattr(self._local, "slot", None)
+        if slot is not None:
+            self._close_thread(slot.state)
+
+    def _stop_if_unused(self, state: _ThreadState) -> None:
+        """Stop a worker thread's Playwright once nothing borrows from it"""
+        if state.keep_idle or state.thread_id != threading.get_ident():
+            return
+        with self._lock:
+            if state.users or state.owned or state.playwright is None:
+                return
+            playwright, state.playwright = state.playwright, None
+        self._stop_playwright(playwright)
+
+    def _close_thread(self, state: _ThreadState) -> None:
+        """
+        Drop a thread's browsers and Playwright; they are closed when this runs
+        on that thread (close(), or the finalizer while the thread finishes)
+        """
+        with self._lock:
+            entries = list(state.owned.values())
+            for entry in entries:
+                self._forget(entry)
+            playwright, state.playwright = state.playwright, None
+            state.users = 0
+        if state.thread_id != threading.get_ident():
+            return
+        for entry in entries:
+            self._close_browser(entry.browser)
+        if playwright is not None:
+            self._stop_playwright(playwright)
+
+    def _forget(self, entry: _PooledBrowser) -> None:
+        """Drop an entry from the lookup tables (caller holds the lock)"""
+        state = entry.state
+        if state.browsers.get(entry.key) is entry:
+            del state.browsers[entry.key]
+        state.owned.pop(id(entry.browser), None)
+        self._by_browser.pop(id(entry.browser), None)
+
+    @staticmethod
+    def _close_browser(browser: "Browser") -> None:
+        try:
+            browser.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled browser: {e}")
+
+    @staticmethod
+    def _stop_playwright(playwright: "Playwright") -> None:
+        try:
+            playwright.stop()
+        except Exception as e:
+            logger.debug(f"Error stopping playwright: {e}")
+
+
+_POOL = BrowserPool()
+atexit.register(_POOL.close)
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the process-wide browser pool"""
+    return _POOL
@@ -0,0 +1,296 @@
+"""
+Settings and helpers shared by GrokWebDriver and AsyncGrokWebDriver
+Launch/context options, stealth script, cookie conversion, model names and
+response filtering; nothing here depends on the sync or async Playwright API
+"""
+import logging
+import os
+import platform
+import re
+import shutil
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from .js_utils import minify_js, verify_deepsearch_enabled_js
+
+logger = logging.getLogger(__name__)
+
+
+# Chrome launch flags (exact flags from MCP browser extension)
+BASE_LAUNCH_ARGS = (
+    "--disable-field-trial-config",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-back-forward-cache",
+    "--disable-breakpad",
+    "--disable-client-side-phishing-detection",
+    "--disable-component-extensions-with-background-pages",
+    "--disable-component-update",
+    "--no-default-browser-check",
+    "--disable-default-apps",
+    "--disable-dev-shm-usage",
+    "--disable-features=AcceptCHFrame,AvoidUnnecessaryBeforeUnloadCheckSync,DestroyProfileOnBrowserClose,DialMediaRouteProvider,GlobalMediaControls,HttpsUpgrades,LensOverlay,MediaRouter,PaintHolding,ThirdPartyStoragePartitioning,Translate,AutoDeElevate,RenderDocument,OptimizationHints,AutomationControlled",
+    "--enable-features=CDPScreenshotNewSurface",
+    "--allow-pre-commit-input",
+    "--disable-hang-monitor",
+    "--disable-ipc-flooding-protection",
+    "--disable-popup-blocking",
+    "--disable-prompt-on-repost",
+    "--disable-renderer-backgrounding",
+    "--force-color-profile=srgb",
+    "--metrics-recording-only",
+    "--no-first-run",
+    "--password-store=basic",
+    "--use-mock-keychain",
+    "--no-service-autorun",
+    "--export-tagged-pdf",
+    "--disable-search-engine-choice-screen",
+    "--unsafely-disable-devtools-self-xss-warnings",
+    "--edge-skip-compat-layer-relaunch",
+    "--disable-infobars",
+    "--disable-sync",
+)
+
+# Headless-specific flags for better compatibility
+HEADLESS_EXTRA_ARGS = (
+    "--disable-gpu",  # GPU not needed in headless
+    "--disable-software-rasterizer",  # Software rasterizer not needed
+    "--no-sandbox",  # Required for some headless environments
+    "--disable-setuid-sandbox",  # Required for some headless environments
+)
+
+BASE_CONTEXT_OPTIONS: Dict[str, Any] = {
+    "viewport": {"width": 1024, "height": 720},
+    "ignore_https_errors": False,
+    "java_script_enabled": True,
+    "locale": "en-US",
+    "timezone_id": "America/New_York",
+    "color_scheme": "light",
+}
+
+STEALTH_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+    "DNT": "1",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+# Chrome user agent (like MCP browser extension)
+STEALTH_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"
+)
+
+STEALTH_INIT_SCRIPT = minify_js("""
+    Object.defineProperty(navigator, 'webdriver', {
+        get: () => undefined
+    });
+    
+    // Chrome-specific properties (already present in Chrome, but ensure they're correct)
+    if (!window.chrome) {
+        window.chrome = { runtime: {} };
+    }
+    
+    // Ensure Chrome-specific navigator properties
+    if (!navigator.plugins) {
+        Object.defineProperty(navigator, 'plugins', {
+            get: () => [1, 2, 3, 4, 5]
+        });
+    }
+    
+    Object.defineProperty(document, 'hidden', {
+        get: () => false,
+        configurable: true
+    });
+    
+    Object.defineProperty(document, 'visibilityState', {
+        get: () => 'visible',
+        configurable: true
+    });
+""")
+
+
+# Any of the chat input variants (CSS selector list; matches in document order)
+CHAT_INPUT_SELECTOR = (
+    'textarea[aria-label*="Ask Grok"], textarea[aria-label*="Ask"], input[aria-label*="Ask Grok"], '
+    'textarea, [contenteditable="true"]'
+)
+
+
+# x.ai authentication cookies; these are also set on the x.ai domains
+_XAI_COOKIE_NAMES = frozenset({'sso', 'sso-rw', 'x-userid', 'x-anonuserid', 'x-challenge', 'x-signature'})
+_XAI_URLS = ("https://x.ai", "https://accounts.x.ai", "https://grok.com")
+_DEFAULT_URLS = ("https://grok.com",)
+_COOKIE_FIELDS = {"secure": True, "sameSite": "Lax"}
+_HOST_PREFIX_COOKIE_FIELDS = {"path": "/"}
+
+
+def build_cookie_list(cookies: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    Convert a name -> value mapping into Playwright add_cookies() entries.
+    
+    Grok uses both grok.com and x.ai (for authentication). Cookies are injected
+    by URL (more reliable than domain/path), as the Perplexity wrapper does.
+    
+    Args:
+        cookies: Dictionary of cookie name -> value
+    
+    Returns:
+        List of cookie dicts; invalid or oversized values are skipped
+    """
+    cookies_list: List[Dict[str, Any]] = []
+    for name, value in cookies.items():
+        if not name or not isinstance(value, str) or len(value) > 4000:
+            continue
+        
+        name = str(name)
+        # Handle __Host- prefix (requires path=/ and no domain)
+        extra = _HOST_PREFIX_COOKIE_FIELDS if name.startswith("__Host-") else {}
+        cookies_list.extend(
+            {"name": name, "value": value, "url": url, **_COOKIE_FIELDS, **extra}
+            for url in (_XAI_URLS if name.lower() in _XAI_COOKIE_NAMES else _DEFAULT_URLS)
+        )
+    return cookies_list
+
+
+# Static assets skipped when block_resources is on. Routing by URL pattern
+# keeps every other request (page loads, API calls, the response stream) off
+# the Python route handler entirely.
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+BLOCKED_RESOURCE_URL_RE = re.compile(
+    r"\.(?:png|jpe?g|gif|webp|avif|ico|svg|woff2?|ttf|otf|eot|mp4|webm|mp3|m4a|ogg)(?:[?#]|$)",
+    re.IGNORECASE,
+)
+
+
+@lru_cache(maxsize=None)
+def find_chrome_executable() -> Optional[str]:
+    """Locate the installed Chrome; looked up once per process"""
+    chrome_executable = None
+    system = platform.system()
+    if system in ("Windows", "Darwin"):
+        # Fixed install locations
+        if system == "Windows":
+            chrome_paths = [
+                r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+                r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+                os.path.expanduser(r"~\AppData\Local\Google\Chrome\Application\chrome.exe"),
+            ]
+        else:  # macOS
+            chrome_paths = [
+                "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+            ]
+        chrome_executable = next((path for path in chrome_paths if os.path.isfile(path)), None)
+    else:  # Linux: whatever is on PATH
+        for name in ("google-chrome", "google-chrome-stable", "chromium-browser"):
+            chrome_executable = shutil.which(name)
+            if chrome_executable:
+                break
+    
+    if chrome_executable:
+        logger.debug(f"Found Chrome at: {chrome_executable}")
+    return chrome_executable
+
+
+def build_launch_options(headless: bool) -> Dict[str, Any]:
+    """Options for chromium.launch() / launch_persistent_context() in the given mode"""
+    chrome_executable = find_chrome_executable()
+
+    if not chrome_executable:
+        logger.warning("Chrome executable not found, falling back to Chromium")
+        chrome_executable = None
+
+    # Chrome launch options (exact flags from MCP browser extension)
+    launch_options: Dict[str, Any] = {
+        "headless": headless,
+        "args": list(BASE_LAUNCH_ARGS),
+    }
+
+    # Add headless-specific flags for better compatibility
+    if headless:
+        launch_options["args"].extend(HEADLESS_EXTRA_ARGS)
+
+    # Use actual Chrome executable if found
+    if chrome_executable:
+        launch_options["executable_path"] = chrome_executable
+        logger.debug(f"Using Chrome executable: {chrome_executable}")
+
+    return launch_options
+
+
+def filter_response_text(response_text: Optional[str], user_message: str) -> Optional[str]:
+    """Return the extracted response, or None when it is empty or just echoes the user's message"""
+    if not response_text:
+        return None
+    response_text_clean = response_text.strip()
+    user_msg_clean = user_message.strip() if user_message else ""
+    
+    # If the extracted text is very similar to the message we sent, it's probably not the response
+    if not response_text_clean or response_text_clean == user_msg_clean:
+        logger.debug("Skipping - extracted text matches user message")
+        return None
+    # Additional check: if it starts with the user message, it might be the user message
+    if not response_text_clean.startswith(user_msg_clean[:50]) or len(response_text_clean) > len(user_msg_clean) * 1.5:
+        return response_text_clean
+    logger.debug("Skipping - looks like user message")
+    return None
+
+
+# Post-click state awaited after toggling DeepSearch
+DEEPSEARCH_ENABLED_PREDICATE_JS = "() => (" + verify_deepsearch_enabled_js() + ")().enabled"
+
+
+def _shows_grok_41(text: str) -> bool:
+    # Grok 4.1 should show "Grok 4.1" in the button
+    return "grok 4.1" in text and "expert" not in text
+
+
+def _shows_grok_41_thinking(text: str) -> bool:
+    # Grok 4.1 Thinking should show "Grok 4.1 Thinking"
+    return "grok 4.1 thinking" in text
+
+
+# Model names selected from the "Models" submenu -> submenu option text
+GROK_MODEL_NAMES = {
+    'grok-4.1': "Grok 4.1",
+    'grok-4-1': "Grok 4.1",
+    'grok-4.1-think': "Grok 4.1 Thinking",
+    'grok-4-1-think': "Grok 4.1 Thinking",
+    'grok-4.1-thinking': "Grok 4.1 Thinking",
+    'grok-4-1-thinking': "Grok 4.1 Thinking",
+}
+
+_GROK_MODEL_CHECKS = {
+    "Grok 4.1": _shows_grok_41,
+    "Grok 4.1 Thinking": _shows_grok_41_thinking,
+}
+
+# Model name -> check on the lowercased model selector text
+_MODEL_VERIFIERS = {
+    **{name: _GROK_MODEL_CHECKS[option] for name, option in GROK_MODEL_NAMES.items()},
+    # Expert should show "Expert" but not "Grok 4.1"
+    'expert': lambda text: "expert" in text and "grok 4.1" not in text,
+    'fast': lambda text: "fast" in text,
+    'auto': lambda text: "auto" in text,
+}
+
+
+# Map model names to actual menu item text (from HTML structure)
+MODEL_TEXT_MAP = {
+    'auto': 'Auto Chooses Fast or Expert',
+    'fast': 'Fast Quick responses',
+    'expert': 'Expert Thinks hard',
+    'grok-4-fast': 'Grok 4 Fast Beta',
+    'heavy': 'Heavy Team of experts'
+}
+
+
+def model_text_matches(model_lower: str, current_model: str) -> bool:
+    """Whether the lowercased model selector text shows the given model"""
+    matches = _MODEL_VERIFIERS.get(model_lower)
+    if matches is None:
+        # For other models, use simple substring match
+        return model_lower in current_model
+    return matches(current_model)
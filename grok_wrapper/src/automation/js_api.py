@@ -0,0 +1,128 @@
+"""
+Page-scoped JavaScript API for repeated DOM lookups
+Installs the automation snippets once per document as window.__grokHelpers
+and invokes them by name instead of re-sending source on every evaluate()
+"""
+import logging
+from typing import TYPE_CHECKING, Any, Union
+
+from .js_utils import (
+    find_deepsearch_button_js,
+    verify_deepsearch_enabled_js,
+    click_deepsearch_button_js,
+    find_private_button_js,
+    verify_private_mode_js,
+    set_private_mode_js,
+    select_model_menu_item_js,
+    select_grok_model_js,
+    session_state_js,
+    stop_button_visible_js,
+    extract_response_js
+)
+from .page_verification import verify_grok_homepage_js, wait_for_grok_homepage_js
+from .popup_handler import close_popups_js
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext as AsyncBrowserContext, Page as AsyncPage
+    from playwright.sync_api import BrowserContext, Page
+
+logger = logging.getLogger(__name__)
+
+_HELPERS = {
+    'findDeepSearch': find_deepsearch_button_js(),
+    'verifyDeepSearch': verify_deepsearch_enabled_js(),
+    'findPrivate': find_private_button_js(),
+    'verifyPrivate': verify_private_mode_js(),
+    'verifyHomepage': verify_grok_homepage_js(),
+    'checkHomepageReady': wait_for_grok_homepage_js(),
+    'closePopups': close_popups_js(),
+    'clickDeepSearch': click_deepsearch_button_js(),
+    'setPrivateMode': set_private_mode_js(),
+    'selectModelItem': select_model_menu_item_js(),
+    'selectGrokModel': select_grok_model_js(),
+    'sessionState': session_state_js(),
+    'detectStopButton': stop_button_visible_js(),
+    'extractResponse': extract_response_js(),
+}
+
+_INSTALL_JS = (
+    "window.__grokHelpers = Object.assign(window.__grokHelpers || {}, {"
+    + ",".join(f"{name}: {source}" for name, source in _HELPERS.items())
+    + "});"
+)
+
+# None arrives as null; map it to undefined so JS default parameters apply
+_INVOKE_JS = """([name, arg]) => {
+    const helpers = window.__grokHelpers;
+    if (!helpers) return { __grokHelpersMissing: true };
+    return helpers[name](arg === null ? undefined : arg);
+}"""
+
+# Fallback for documents without the namespace: install and call in one round trip
+_INSTALL_AND_INVOKE_JS = (
+    "([name, arg]) => {"
+    + _INSTALL_JS
+    + "return window.__grokHelpers[name](arg === null ? undefined : arg);}"
+)
+
+
+def register_automation_helpers(target: Union["BrowserContext", "Page"]) -> None:
+    """
+    Install the helpers in every document the context or page loads.
+
+    Args:
+        target: Playwright BrowserContext or Page (both support add_init_script)
+    """
+    target.add_init_script(script=_INSTALL_JS)
+
+
+def evaluate_js_api(page: "Page", name: str, arg: Any = None) -> Any:
+    """
+    Call a helper from window.__grokHelpers.
+
+    Documents loaded before register_automation_helpers() ran (or pages of an
+    unregistered context) lack the namespace; it is installed on demand as
+    part of a single retried call.
+
+    Args:
+        page: Playwright page
+        name: Helper name (e.g. 'verifyPrivate', 'closePopups')
+        arg: Optional JSON-serializable argument passed to the helper
+
+    Returns:
+        The helper's return value
+    """
+    result = page.evaluate(_INVOKE_JS, [name, arg])
+    if isinstance(result, dict) and result.get('__grokHelpersMissing'):
+        logger.debug("JS helpers not installed in this document, installing")
+        result = page.evaluate(_INSTALL_AND_INVOKE_JS, [name, arg])
+    return result
+
+
+async def evaluate_js_api_async(page: "AsyncPage", name: str, arg: Any = None) -> Any:
+    """
+    Async counterpart of evaluate_js_api() for playwright.async_api pages.
+
+    Args:
+        page: Async Playwright page
+        name: Helper name (e.g. 'verifyPrivate', 'closePopups')
+        arg: Optional JSON-serializable argument passed to the helper
+
+    Returns:
+        The helper's return value
+    """
+    result = await page.evaluate(_INVOKE_JS, [name, arg])
+    if isinstance(result, dict) and result.get('__grokHelpersMissing'):
+        logger.debug("JS helpers not installed in this document, installing")
+        result = await page.evaluate(_INSTALL_AND_INVOKE_JS, [name, arg])
+    return result
+
+
+async def register_automation_helpers_async(target: Union["AsyncBrowserContext", "AsyncPage"]) -> None:
+    """
+    Async counterpart of register_automation_helpers().
+
+    Args:
+        target: Async Playwright BrowserContext or Page
+    """
+    await target.add_init_script(script=_INSTALL_JS)
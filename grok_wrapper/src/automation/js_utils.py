@@ -2,17 +2,104 @@
 JavaScript utilities for browser automation
 Contains reusable JavaScript code snippets for Playwright page.evaluate()
 """
+import json
+import re
+from functools import lru_cache
 
+# String literals are matched first so that comment markers and whitespace
+# inside quotes are left untouched (e.g. 'https://grok.com').
+_JS_TOKEN_RE = re.compile(
+    r"""('(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*"|`(?:\\.|[^`\\])*`)"""
+    r"|((?:\s|/\*.*?\*/|//[^\n]*)+)",
+    re.DOTALL,
+)
 
-def find_deepsearch_button_js() -> str:
+
+def minify_js(source: str) -> str:
     """
-    JavaScript code to find and click the DeepSearch button.
-    
+    Strip comments and collapse whitespace in a JavaScript snippet.
+
+    Every snippet in this package terminates its statements explicitly, so
+    joining lines never changes how the code parses. Regex literals must not
+    contain quotes or '//' since they are not tokenized.
+
+    Args:
+        source: JavaScript source code
+
     Returns:
-        JavaScript code as string for use with page.evaluate()
+        Minified JavaScript code
     """
-    return """
-        () => {
+    def _replace(match):
+        return match.group(1) or ' '
+
+    return _JS_TOKEN_RE.sub(_replace, source).strip()
+
+
+# Shared visibility check spliced into snippets below. Reads computed style
+# first so hidden elements never pay for a layout read.
+_IS_VISIBLE_JS = """
+            const isVisible = (el) => {
+                const style = window.getComputedStyle(el);
+                if (style.display === 'none' || style.visibility === 'hidden') return false;
+                const rect = el.getBoundingClientRect();
+                return rect.width > 0 && rect.height > 0;
+            };
+"""
+
+# Scrolling forces layout and paint, so only do it for elements that are
+# not already fully inside the viewport. Pass a rect already read to skip
+# another layout query.
+_SCROLL_INTO_VIEW_JS = """
+            const scrollIntoViewIfNeeded = (el, rect = el.getBoundingClientRect()) => {
+                if (rect.top < 0 || rect.left < 0 ||
+                    rect.bottom > window.innerHeight || rect.right > window.innerWidth) {
+                    el.scrollIntoView({ behavior: 'instant', block: 'center' });
+                }
+            };
+"""
+
+# React listens for pointer events; one pointerdown/pointerup pair followed by
+# a native click() is enough, with a single options object shared by both.
+_PRESS_AND_CLICK_JS = """
+            const POINTER_OPTS = { bubbles: true, cancelable: true, pointerId: 1 };
+            const pressAndClick = (el) => {
+                el.dispatchEvent(new PointerEvent('pointerdown', POINTER_OPTS));
+                el.dispatchEvent(new PointerEvent('pointerup', POINTER_OPTS));
+                el.click();
+            };
+"""
+
+# Resolve as soon as predicate() returns something truthy, re-checking on DOM
+# mutations instead of polling; resolves null after timeoutMs.
+_WAIT_FOR_DOM_JS = """
+            const waitForDom = (predicate, timeoutMs) => {
+                const found = predicate();
+                if (found) return Promise.resolve(found);
+                return new Promise((resolve) => {
+                    const observer = new MutationObserver(() => {
+                        const value = predicate();
+                        if (value) {
+                            observer.disconnect();
+                            clearTimeout(timer);
+                            resolve(value);
+                        }
+                    });
+                    const timer = setTimeout(() => {
+                        observer.disconnect();
+                        resolve(null);
+                    }, timeoutMs);
+                    observer.observe(document.body, { childList: true, subtree: true, attributes: true });
+                });
+            };
+"""
+
+
+_FIND_DEEPSEARCH_BUTTON_JS = minify_js("""
+        (opts = {}) => {""" + _IS_VISIBLE_JS + _SCROLL_INTO_VIEW_JS + _PRESS_AND_CLICK_JS + """
+            // Laxer than isVisible(): the fallback strategies also accept a
+            // button that is only in the DOM (collapsed or off-screen)
+            const isInDom = (el) => el.offsetParent !== null || window.getComputedStyle(el).display !== 'none';
+
             // Search the entire document - DeepSearch button has data-slot="button" and text "DeepSearch"
             const searchArea = document.body;
             
@@ -39,103 +126,65 @@ def find_deepsearch_button_js() -> str:
             }
             
             // Now search for DeepSearch button in the relevant area
-            const buttonsInArea = Array.from(searchContainer.querySelectorAll('button, [role="button"], [data-slot="button"]'));
+            const buttonsInArea = searchContainer.querySelectorAll('button, [role="button"], [data-slot="button"]');
             
             // Sort by position (leftmost = smallest x)
-            const buttonsWithPos = buttonsInArea.map(btn => {
+            const buttonsWithPos = [];
+            for (const btn of buttonsInArea) {
+                if (!isVisible(btn)) continue;
                 const rect = btn.getBoundingClientRect();
                 const text = (btn.innerText || btn.textContent || '').trim();
-                return { button: btn, text: text, x: rect.x, y: rect.y, rect: rect };
-            }).filter(b => {
-                const style = window.getComputedStyle(b.button);
-                return b.rect.width > 0 && b.rect.height > 0 && style.display !== 'none';
-            });
+                buttonsWithPos.push({ button: btn, text: text, x: rect.x, y: rect.y, rect: rect });
+            }
             
             // Look for DeepSearch button
             for (const btnInfo of buttonsWithPos) {
                 const text = btnInfo.text;
                 if (text === 'DeepSearch' || text.toLowerCase() === 'deepsearch') {
                     const btn = btnInfo.button;
-                    btn.scrollIntoView({ behavior: 'instant', block: 'center' });
-                    btn.click();
-                    btn.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true }));
-                    btn.dispatchEvent(new PointerEvent('pointerdown', { bubbles: true, cancelable: true, pointerId: 1 }));
-                    btn.dispatchEvent(new PointerEvent('pointerup', { bubbles: true, cancelable: true, pointerId: 1 }));
+                    scrollIntoViewIfNeeded(btn, btnInfo.rect);
+                    pressAndClick(btn);
                     return { clicked: true, text: text, method: 'below-chat-box', x: btnInfo.x, y: btnInfo.y };
                 }
             }
             
-            // Fallback: Search ALL elements for text "DeepSearch" (most aggressive)
-            const allElements = Array.from(searchArea.querySelectorAll('*'));
-            for (const el of allElements) {
-                const text = (el.innerText || el.textContent || '').trim();
-                if (text === 'DeepSearch' || text.toLowerCase() === 'deepsearch') {
-                    // Found element with DeepSearch text - try to click it
-                    const rect = el.getBoundingClientRect();
-                    const style = window.getComputedStyle(el);
-                    const isInDOM = el.offsetParent !== null || style.display !== 'none';
+            // Fallback: Search ALL text nodes for "DeepSearch" (most aggressive)
+            const walker = document.createTreeWalker(searchArea, NodeFilter.SHOW_TEXT, {
+                acceptNode: (node) => node.nodeValue.trim().toLowerCase() === 'deepsearch'
+                    ? NodeFilter.FILTER_ACCEPT
+                    : NodeFilter.FILTER_REJECT
+            });
+            for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+                const el = node.parentElement;
+                const text = node.nodeValue.trim();
+                // Found element with DeepSearch text - try to click it
+                if (el && isInDom(el)) {
+                    scrollIntoViewIfNeeded(el);
                     
-                    if (isInDOM) {
-                        el.scrollIntoView({ behavior: 'instant', block: 'center' });
-                        
-                        // Try clicking the element or find its parent button
-                        let clickTarget = el;
-                        if (el.tagName !== 'BUTTON' && el.tagName !== 'A') {
-                            // If it's not a button, find the nearest button parent
-                            let parent = el.parentElement;
-                            while (parent && parent !== document.body) {
-                                if (parent.tagName === 'BUTTON' || parent.tagName === 'A' || parent.getAttribute('role') === 'button') {
-                                    clickTarget = parent;
-                                    break;
-                                }
-                                parent = parent.parentElement;
-                            }
-                        }
-                        
-                        clickTarget.click();
-                        clickTarget.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true }));
-                        clickTarget.dispatchEvent(new PointerEvent('pointerdown', { bubbles: true, cancelable: true, pointerId: 1 }));
-                        clickTarget.dispatchEvent(new PointerEvent('pointerup', { bubbles: true, cancelable: true, pointerId: 1 }));
-                        return { clicked: true, text: text, method: 'text-search-all', tag: el.tagName, clickTarget: clickTarget.tagName };
-                    }
+                    // Click the nearest button/link around the text, or the element itself
+                    const clickTarget = el.closest('button, a, [role="button"]') || el;
+                    
+                    pressAndClick(clickTarget);
+                    return { clicked: true, text: text, method: 'text-search-all', tag: el.tagName, clickTarget: clickTarget.tagName };
                 }
             }
             
             // Strategy 1: Look for button[data-slot="button"] with text "DeepSearch" (exact match)
-            // Check both visible and potentially hidden buttons (they might be off-screen)
-            const dataSlotBtns = Array.from(searchArea.querySelectorAll('button[data-slot="button"]'));
+            const dataSlotBtns = searchArea.querySelectorAll('button[data-slot="button"]');
             for (const button of dataSlotBtns) {
                 const text = (button.innerText || button.textContent || '').trim();
                 if (text === 'DeepSearch' || text.toLowerCase() === 'deepsearch') {
-                    // Check if button exists (even if not visible)
-                    const rect = button.getBoundingClientRect();
-                    const style = window.getComputedStyle(button);
-                    const isInDOM = button.offsetParent !== null || style.display !== 'none';
-                    
-                    // Try to make it visible by scrolling
-                    if (isInDOM) {
-                        button.scrollIntoView({ behavior: 'instant', block: 'center' });
-                        
-                        // Check visibility again after scroll
-                        const rectAfter = button.getBoundingClientRect();
-                        const isVisible = rectAfter.width > 0 && rectAfter.height > 0 && 
-                                         !button.hasAttribute('hidden') &&
-                                         style.display !== 'none' &&
-                                         style.visibility !== 'hidden';
-                        
-                        if (isVisible || isInDOM) {  // Try clicking even if not fully visible
-                            button.click();
-                            button.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true }));
-                            button.dispatchEvent(new PointerEvent('pointerdown', { bubbles: true, cancelable: true, pointerId: 1 }));
-                            button.dispatchEvent(new PointerEvent('pointerup', { bubbles: true, cancelable: true, pointerId: 1 }));
-                            return { clicked: true, text: text, method: 'data-slot-exact', visible: isVisible };
-                        }
+                    // Off-screen buttons still count; scrolling brings them into view
+                    if (isInDom(button)) {
+                        scrollIntoViewIfNeeded(button);
+                        pressAndClick(button);
+                        return { clicked: true, text: text, method: 'data-slot-exact', visible: isVisible(button) };
                     }
                 }
             }
             
             // Strategy 2: Find all buttons and check text content
-            const allButtons = Array.from(searchArea.querySelectorAll('button'));
+            const allButtons = searchArea.querySelectorAll('button');
             
             // Look for DeepSearch button - case insensitive and check all text
             for (const button of allButtons) {
@@ -144,7 +193,8 @@ def find_deepsearch_button_js() -> str:
                 const lowerText = text.toLowerCase();
                 
                 // Check aria-label and title attributes
-                const ariaLabel = (button.getAttribute('aria-label') || '').toLowerCase();
+                const ariaLabelAttr = button.getAttribute('aria-label');
+                const ariaLabel = (ariaLabelAttr || '').toLowerCase();
                 const title = (button.getAttribute('title') || '').toLowerCase();
                 const id = (button.id || '').toLowerCase();
                 const testId = (button.getAttribute('data-testid') || '').toLowerCase();
@@ -162,30 +212,23 @@ def find_deepsearch_button_js() -> str:
                     testId.includes('deepsearch')) {
                     
                     // Make sure button is visible
-                    const rect = button.getBoundingClientRect();
-                    const isVisible = rect.width > 0 && rect.height > 0 && 
-                                     button.offsetParent !== null && 
-                                     !button.hasAttribute('hidden') &&
-                                     window.getComputedStyle(button).display !== 'none';
-                    
-                    if (!isVisible) {
+                    if (!isVisible(button)) {
                         continue; // Skip hidden buttons
                     }
                     
                     // Scroll into view if needed
-                    button.scrollIntoView({ behavior: 'instant', block: 'center' });
+                    scrollIntoViewIfNeeded(button);
                     
-                    // Try multiple click methods
-                    button.click();
-                    // Also dispatch events to ensure it's registered
-                    button.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true }));
-                    button.dispatchEvent(new PointerEvent('pointerdown', { bubbles: true, cancelable: true, pointerId: 1 }));
-                    button.dispatchEvent(new PointerEvent('pointerup', { bubbles: true, cancelable: true, pointerId: 1 }));
+                    pressAndClick(button);
                     
-                    return { clicked: true, text: text, ariaLabel: button.getAttribute('aria-label'), visible: isVisible, method: 'text-match' };
+                    return { clicked: true, text: text, ariaLabel: ariaLabelAttr, visible: true, method: 'text-match' };
                 }
             }
             
+            if (!opts.debug) {
+                return { clicked: false };
+            }
+            
             // Debug: return info about ALL buttons found (more details) - including those with empty text
             // Focus on buttons with data-slot="button" first
             const dataSlotBtnsForDebug = Array.from(searchArea.querySelectorAll('button[data-slot="button"]'));
@@ -224,133 +267,150 @@ def find_deepsearch_button_js() -> str:
             
             return { clicked: false, found: allButtons.length, dataSlotButtons: dataSlotBtnsForDebug.length, sampleButtons: allButtonInfo, regularButtons: regularButtons };
         }
-    """
+    """)
 
 
-def find_deepsearch_button_simple_js() -> str:
+def find_deepsearch_button_js() -> str:
     """
-    Simplified JavaScript to find DeepSearch button by text.
+    JavaScript code to find and click the DeepSearch button.
+    Pass {debug: true} as the argument to get details about the buttons
+    on the page when nothing was clicked.
     
     Returns:
         JavaScript code as string for use with page.evaluate()
     """
-    return """
-        () => {
+    return _FIND_DEEPSEARCH_BUTTON_JS
+
+
+_FIND_DEEPSEARCH_BUTTON_SIMPLE_JS = minify_js("""
+        () => {""" + _IS_VISIBLE_JS + """
             // Find all buttons with "DeepSearch" text
-            const buttons = Array.from(document.querySelectorAll('button'));
+            const buttons = document.querySelectorAll('button');
             for (const btn of buttons) {
                 const text = (btn.innerText || btn.textContent || '').trim();
                 if (text === 'DeepSearch' || text.toLowerCase() === 'deepsearch') {
                     // Check if it's visible
-                    const rect = btn.getBoundingClientRect();
-                    const style = window.getComputedStyle(btn);
-                    if (rect.width > 0 && rect.height > 0 && style.display !== 'none') {
+                    if (isVisible(btn)) {
+                        const rect = btn.getBoundingClientRect();
                         return { found: true, text: text, x: rect.x, y: rect.y };
                     }
                 }
             }
             return { found: false };
         }
-    """
+    """)
 
 
-def verify_deepsearch_enabled_js() -> str:
+def find_deepsearch_button_simple_js() -> str:
     """
-    JavaScript to verify DeepSearch is enabled by checking for success indicators.
+    Simplified JavaScript to find DeepSearch button by text.
     
     Returns:
         JavaScript code as string for use with page.evaluate()
     """
-    return """
+    return _FIND_DEEPSEARCH_BUTTON_SIMPLE_JS
+
+
+_VERIFY_DEEPSEARCH_ENABLED_JS = minify_js("""
         () => {
+            // Collect, in one pass over the text nodes, every element whose whole
+            // text is "DeepSearch": the text node's parent and any wrappers around it
+            const textHosts = [];
+            const seenHosts = new Set();
+            const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT, {
+                acceptNode: (node) => node.nodeValue.trim() === 'DeepSearch'
+                    ? NodeFilter.FILTER_ACCEPT
+                    : NodeFilter.FILTER_REJECT
+            });
+            for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+                for (let el = node.parentElement;
+                     el && !seenHosts.has(el) && el.textContent.trim() === 'DeepSearch';
+                     el = el.parentElement) {
+                    seenHosts.add(el);
+                    textHosts.push(el);
+                }
+            }
+            
             // Check for Memo component with DeepSearch text (success indicator)
-            const memoElements = Array.from(document.querySelectorAll('*'));
-            for (const el of memoElements) {
-                const text = (el.innerText || el.textContent || '').trim();
-                // Check if it's a Memo component (React component, might have workspaceId prop)
-                if (text === 'DeepSearch') {
-                    // Check if parent has workspaceId attribute or is a Memo-like component
-                    const parent = el.parentElement;
-                    if (parent) {
-                        const parentText = (parent.innerText || parent.textContent || '').trim();
-                        // Look for the chip/div indicator
-                        if (parent.classList && (
-                            parent.classList.contains('chip') || 
-                            parent.className.includes('bg-chip') ||
-                            parent.className.includes('text-primary')
-                        )) {
-                            return { enabled: true, indicator: 'chip-div', element: 'div' };
-                        }
+            for (const el of textHosts) {
+                // Check if parent has workspaceId attribute or is a Memo-like component
+                const parent = el.parentElement;
+                if (parent) {
+                    // Look for the chip/div indicator
+                    const cl = parent.classList;
+                    if (cl.contains('chip') ||
+                        cl.contains('bg-chip') ||
+                        cl.contains('text-primary')) {
+                        return { enabled: true, indicator: 'chip-div', element: 'div' };
                     }
                 }
             }
             
             // Check for div with DeepSearch text and chip styling
-            const divs = Array.from(document.querySelectorAll('div'));
-            for (const div of divs) {
-                const text = (div.innerText || div.textContent || '').trim();
-                if (text === 'DeepSearch') {
-                    const className = div.className || '';
-                    // Check for chip styling indicators
-                    if (className.includes('bg-chip') || 
-                        className.includes('text-primary') || 
-                        className.includes('border-border-l1')) {
-                        return { enabled: true, indicator: 'chip-div', element: 'div' };
-                    }
+            for (const div of textHosts) {
+                if (div.tagName !== 'DIV') continue;
+                const cl = div.classList;
+                // Check for chip styling indicators
+                if (cl.contains('bg-chip') ||
+                    cl.contains('text-primary') ||
+                    cl.contains('border-border-l1')) {
+                    return { enabled: true, indicator: 'chip-div', element: 'div' };
                 }
             }
             
             // Fallback: check if any element contains DeepSearch in a chip-like container
-            const allElements = Array.from(document.querySelectorAll('*'));
-            for (const el of allElements) {
-                const text = (el.innerText || el.textContent || '').trim();
-                if (text === 'DeepSearch') {
-                    // Check if it's in a styled container (chip-like)
-                    let parent = el.parentElement;
-                    let depth = 0;
-                    while (parent && depth < 3) {
-                        const parentClass = parent.className || '';
-                        if (parentClass.includes('chip') || 
-                            parentClass.includes('bg-chip') ||
-                            parentClass.includes('rounded-xl')) {
-                            return { enabled: true, indicator: 'parent-chip', element: parent.tagName };
-                        }
-                        parent = parent.parentElement;
-                        depth++;
+            // Matches share most of their ancestors, so classify each ancestor only once
+            const seenAncestors = new WeakSet();
+            const isChipAncestor = (node) => {
+                if (seenAncestors.has(node)) return false;
+                seenAncestors.add(node);
+                const cl = node.classList;
+                return cl.contains('chip') ||
+                       cl.contains('bg-chip') ||
+                       cl.contains('rounded-xl');
+            };
+
+            for (const el of textHosts) {
+                // Check if it's in a styled container (chip-like)
+                let parent = el.parentElement;
+                let depth = 0;
+                while (parent && depth < 3) {
+                    if (isChipAncestor(parent)) {
+                        return { enabled: true, indicator: 'parent-chip', element: parent.tagName };
                     }
+                    parent = parent.parentElement;
+                    depth++;
                 }
             }
             
             return { enabled: false };
         }
-    """
+    """)
 
 
-def find_deepsearch_button_exact_js() -> str:
+def verify_deepsearch_enabled_js() -> str:
     """
-    JavaScript to find DeepSearch button using exact selector: button[data-slot="button"] with text "DeepSearch"
+    JavaScript to verify DeepSearch is enabled by checking for success indicators.
     
     Returns:
         JavaScript code as string for use with page.evaluate()
     """
-    return """
-        () => {
+    return _VERIFY_DEEPSEARCH_ENABLED_JS
+
+
+_FIND_DEEPSEARCH_BUTTON_EXACT_JS = minify_js("""
+        (opts = {}) => {""" + _IS_VISIBLE_JS + _SCROLL_INTO_VIEW_JS + """
             // Exact match: button[data-slot="button"] with text "DeepSearch"
-            const exactButtons = Array.from(document.querySelectorAll('button[data-slot="button"]'));
+            const exactButtons = document.querySelectorAll('button[data-slot="button"]');
             
             for (const btn of exactButtons) {
                 const text = (btn.innerText || btn.textContent || '').trim();
                 if (text === 'DeepSearch' || text.toLowerCase() === 'deepsearch') {
-                    const rect = btn.getBoundingClientRect();
-                    const style = window.getComputedStyle(btn);
-                    const isVisible = rect.width > 0 && rect.height > 0 && 
-                                     btn.offsetParent !== null &&
-                                     style.display !== 'none' &&
-                                     style.visibility !== 'hidden';
-                    
-                    if (isVisible) {
+                    if (isVisible(btn)) {
+                        const rect = btn.getBoundingClientRect();
+                        
                         // Scroll into view
-                        btn.scrollIntoView({ behavior: 'instant', block: 'center' });
+                        scrollIntoViewIfNeeded(btn, rect);
                         
                         // Get button details for logging
                         const className = btn.className || '';
@@ -365,35 +425,43 @@ def find_deepsearch_button_exact_js() -> str:
                             height: rect.height,
                             className: className.substring(0, 100),
                             dataSlot: dataSlot,
-                            isVisible: isVisible
+                            isVisible: true
                         };
                     }
                 }
             }
             
+            if (!opts.debug) {
+                return { found: false };
+            }
+            
             // Return debug info
             return { 
                 found: false, 
                 totalDataSlotButtons: exactButtons.length,
-                buttons: exactButtons.slice(0, 10).map(b => ({
+                buttons: Array.from(exactButtons).slice(0, 10).map(b => ({
                     text: (b.innerText || b.textContent || '').trim(),
                     dataSlot: b.getAttribute('data-slot'),
                     className: (b.className || '').substring(0, 50)
                 }))
             };
         }
-    """
+    """)
 
 
-def find_private_button_js() -> str:
+def find_deepsearch_button_exact_js() -> str:
     """
-    JavaScript to find the Private chat toggle button/link.
+    JavaScript to find DeepSearch button using exact selector: button[data-slot="button"] with text "DeepSearch"
+    Pass {debug: true} as the argument to get the button list on a miss.
     
     Returns:
         JavaScript code as string for use with page.evaluate()
     """
-    return """
-        () => {
+    return _FIND_DEEPSEARCH_BUTTON_EXACT_JS
+
+
+_FIND_PRIVATE_BUTTON_JS = minify_js("""
+        () => {""" + _IS_VISIBLE_JS + """
             // Look for Private button/link by aria-label
             const privateSelectors = [
                 'a[aria-label*="Switch to Private Chat" i]',
@@ -404,64 +472,49 @@ def find_private_button_js() -> str:
             ];
             
             for (const selector of privateSelectors) {
-                try {
-                    const elements = Array.from(document.querySelectorAll(selector));
-                    for (const el of elements) {
-                        const text = (el.innerText || el.textContent || '').trim();
-                        if (text === 'Private' || text.toLowerCase() === 'private') {
+                const elements = document.querySelectorAll(selector);
+                for (const el of elements) {
+                    const text = (el.innerText || el.textContent || '').trim();
+                    if (text === 'Private' || text.toLowerCase() === 'private') {
+                        if (isVisible(el)) {
                             const rect = el.getBoundingClientRect();
-                            const style = window.getComputedStyle(el);
-                            const isVisible = rect.width > 0 && rect.height > 0 && 
-                                             el.offsetParent !== null &&
-                                             style.display !== 'none' &&
-                                             style.visibility !== 'hidden';
+                            const ariaLabel = el.getAttribute('aria-label') || '';
+                            const className = el.getAttribute('class') || '';
+                            const href = el.getAttribute('href') || '';
                             
-                            if (isVisible) {
-                                const ariaLabel = el.getAttribute('aria-label') || '';
-                                const className = el.className || '';
-                                const href = el.getAttribute('href') || '';
-                                
-                                // Check if already in private mode (has purple color classes)
-                                const isPrivate = className.includes('text-purple-400') || 
-                                                 className.includes('text-purple-300') ||
-                                                 ariaLabel.includes('Switch to Default Chat');
-                                
-                                return {
-                                    found: true,
-                                    element: el.tagName,
-                                    text: text,
-                                    ariaLabel: ariaLabel,
-                                    href: href,
-                                    className: className.substring(0, 100),
-                                    isPrivate: isPrivate,
-                                    x: rect.x,
-                                    y: rect.y,
-                                    visible: isVisible
-                                };
-                            }
+                            // Check if already in private mode (has purple color classes)
+                            const isPrivate = el.classList.contains('text-purple-400') || 
+                                             el.classList.contains('text-purple-300') ||
+                                             ariaLabel.includes('Switch to Default Chat');
+                            
+                            return {
+                                found: true,
+                                element: el.tagName,
+                                text: text,
+                                ariaLabel: ariaLabel,
+                                href: href,
+                                className: className.substring(0, 100),
+                                isPrivate: isPrivate,
+                                x: rect.x,
+                                y: rect.y,
+                                visible: true
+                            };
                         }
                     }
-                } catch (e) {
-                    // Continue to next selector
                 }
             }
             
             // Fallback: search by text "Private"
-            const allElements = Array.from(document.querySelectorAll('a, button'));
+            const allElements = document.querySelectorAll('a, button');
             for (const el of allElements) {
                 const text = (el.innerText || el.textContent || '').trim();
                 if (text === 'Private' || text.toLowerCase() === 'private') {
-                    const rect = el.getBoundingClientRect();
-                    const style = window.getComputedStyle(el);
-                    const isVisible = rect.width > 0 && rect.height > 0 && 
-                                     el.offsetParent !== null &&
-                                     style.display !== 'none';
-                    
-                    if (isVisible) {
+                    if (isVisible(el)) {
+                        const rect = el.getBoundingClientRect();
                         const ariaLabel = el.getAttribute('aria-label') || '';
-                        const className = el.className || '';
-                        const isPrivate = className.includes('text-purple-400') || 
-                                       className.includes('text-purple-300') ||
+                        const className = el.getAttribute('class') || '';
+                        const isPrivate = el.classList.contains('text-purple-400') || 
+                                       el.classList.contains('text-purple-300') ||
                                        ariaLabel.includes('Switch to Default Chat');
                         
                         return {
@@ -473,7 +526,7 @@ def find_private_button_js() -> str:
                             isPrivate: isPrivate,
                             x: rect.x,
                             y: rect.y,
-                            visible: isVisible
+                            visible: true
                         };
                     }
                 }
@@ -481,17 +534,20 @@ def find_private_button_js() -> str:
             
             return { found: false };
         }
-    """
+    """)
 
 
-def verify_private_mode_js() -> str:
+def find_private_button_js() -> str:
     """
-    JavaScript to verify if Private mode is currently active.
+    JavaScript to find the Private chat toggle button/link.
     
     Returns:
         JavaScript code as string for use with page.evaluate()
     """
-    return """
+    return _FIND_PRIVATE_BUTTON_JS
+
+
+_VERIFY_PRIVATE_MODE_JS = minify_js("""
         () => {
             // Look for Private button and check its state
             const privateSelectors = [
@@ -500,43 +556,39 @@ def verify_private_mode_js() -> str:
             ];
             
             for (const selector of privateSelectors) {
-                try {
-                    const elements = Array.from(document.querySelectorAll(selector));
-                    for (const el of elements) {
-                        const text = (el.innerText || el.textContent || '').trim();
-                        if (text === 'Private' || text.toLowerCase() === 'private') {
-                            const ariaLabel = el.getAttribute('aria-label') || '';
-                            const className = el.className || '';
-                            
-                            // Private mode is active if:
-                            // 1. Has purple color classes
-                            // 2. aria-label says "Switch to Default Chat" (meaning we're in private, can switch to default)
-                            const isPrivate = className.includes('text-purple-400') || 
-                                           className.includes('text-purple-300') ||
-                                           ariaLabel.includes('Switch to Default Chat');
-                            
-                            return {
-                                found: true,
-                                isPrivate: isPrivate,
-                                ariaLabel: ariaLabel,
-                                className: className.substring(0, 100)
-                            };
-                        }
+                const elements = document.querySelectorAll(selector);
+                for (const el of elements) {
+                    const text = (el.innerText || el.textContent || '').trim();
+                    if (text === 'Private' || text.toLowerCase() === 'private') {
+                        const ariaLabel = el.getAttribute('aria-label') || '';
+                        const className = el.getAttribute('class') || '';
+                        
+                        // Private mode is active if:
+                        // 1. Has purple color classes
+                        // 2. aria-label says "Switch to Default Chat" (meaning we're in private, can switch to default)
+                        const isPrivate = el.classList.contains('text-purple-400') || 
+                                       el.classList.contains('text-purple-300') ||
+                                       ariaLabel.includes('Switch to Default Chat');
+                        
+                        return {
+                            found: true,
+                            isPrivate: isPrivate,
+                            ariaLabel: ariaLabel,
+                            className: className.substring(0, 100)
+                        };
                     }
-                } catch (e) {
-                    // Continue
                 }
             }
             
             // Fallback: search by text
-            const allElements = Array.from(document.querySelectorAll('a, button'));
+            const allElements = document.querySelectorAll('a, button');
             for (const el of allElements) {
                 const text = (el.innerText || el.textContent || '').trim();
                 if (text === 'Private' || text.toLowerCase() === 'private') {
                     const ariaLabel = el.getAttribute('aria-label') || '';
-                    const className = el.className || '';
-                    const isPrivate = className.includes('text-purple-400') || 
-                                   className.includes('text-purple-300') ||
+                    const className = el.getAttribute('class') || '';
+                    const isPrivate = el.classList.contains('text-purple-400') || 
+                                   el.classList.contains('text-purple-300') ||
                                    ariaLabel.includes('Switch to Default Chat');
                     
                     return {
@@ -550,122 +602,407 @@ def verify_private_mode_js() -> str:
             
             return { found: false, isPrivate: false };
         }
+    """)
+
+
+def verify_private_mode_js() -> str:
+    """
+    JavaScript to verify if Private mode is currently active.
+    
+    Returns:
+        JavaScript code as string for use with page.evaluate()
     """
+    return _VERIFY_PRIVATE_MODE_JS
 
 
-def find_private_button_js() -> str:
+_SELECT_MODEL_MENU_ITEM_JS = minify_js("""
+        async (targetText) => {""" + _WAIT_FOR_DOM_JS + _SCROLL_INTO_VIEW_JS + """
+            // Step 1: open the model selector
+            const trigger = document.querySelector('#model-select-trigger, button[aria-label="Model select"]');
+            if (!trigger) {
+                return { clicked: false, menuVisible: false, itemClicked: false };
+            }
+            trigger.click();
+            
+            const hasBox = (el) => {
+                const rect = el.getBoundingClientRect();
+                return rect.width > 0 && rect.height > 0;
+            };
+            const findMenu = () => {
+                // Check for menu in main document
+                const menu = document.querySelector('[role="menu"]');
+                if (menu && hasBox(menu) && menu.offsetParent !== null) {
+                    const style = window.getComputedStyle(menu);
+                    if (style.display !== 'none' && style.visibility !== 'hidden') return menu;
+                }
+                // Also check in any portals/overlays (Radix UI often uses portals)
+                for (const portal of document.querySelectorAll('[data-radix-portal], [data-radix-menu-content]')) {
+                    const menuInPortal = portal.querySelector('[role="menu"]');
+                    if (menuInPortal && hasBox(menuInPortal)) return menuInPortal;
+                }
+                return null;
+            };
+            const findItem = () => {
+                // Match exact text only
+                for (const item of document.querySelectorAll('[role="menuitem"]')) {
+                    if ((item.innerText || item.textContent || '').trim() === targetText) return item;
+                }
+                return null;
+            };
+            
+            // Step 2: wait in the page until the menu is open and the item rendered
+            let menuVisible = false;
+            const ready = () => {
+                if (!findMenu()) return null;
+                menuVisible = true;
+                return findItem();
+            };
+            const targetItem = await waitForDom(ready, 1000);
+            if (!targetItem) {
+                return { clicked: true, menuVisible: menuVisible, itemClicked: false };
+            }
+            
+            // Step 3: click the menu item
+            scrollIntoViewIfNeeded(targetItem);
+            targetItem.click();
+            return { clicked: true, menuVisible: true, itemClicked: true };
+        }
+    """)
+
+
+def select_model_menu_item_js() -> str:
     """
-    JavaScript to find the Private chat toggle button/link.
+    JavaScript that opens the model selector, waits for the menu and clicks
+    the menu item whose text equals the argument, all in one evaluate().
+    
+    Returns:
+        JavaScript code as string for use with page.evaluate(js, target_text)
+    """
+    return _SELECT_MODEL_MENU_ITEM_JS
+
+
+_SELECT_GROK_MODEL_JS = minify_js("""
+        async (targetName) => {""" + _WAIT_FOR_DOM_JS + _PRESS_AND_CLICK_JS + """
+            // 1. Open the main menu (Radix triggers open on pointerdown)
+            const trigger = document.querySelector('#model-select-trigger');
+            if (!trigger) return { selected: false, step: 'trigger' };
+            pressAndClick(trigger);
+            
+            // 2. Open the "Models" submenu
+            const modelsItem = await waitForDom(() => {
+                for (const item of document.querySelectorAll('[role="menuitem"]')) {
+                    if ((item.textContent || '').includes('Models')) return item;
+                }
+                return null;
+            }, 1000);
+            if (!modelsItem) return { selected: false, step: 'models' };
+            modelsItem.dispatchEvent(new PointerEvent('pointermove', { bubbles: true, pointerType: 'mouse' }));
+            modelsItem.click();
+            
+            // 3. Select the target model from the submenu (second menu);
+            // "Grok 4.1" must not match "Grok 4.1 Thinking"
+            const wanted = targetName.toLowerCase();
+            const matches = wanted === 'grok 4.1'
+                ? (text) => text.includes('grok 4.1') && !text.includes('thinking')
+                : (text) => text.includes(wanted);
+            const option = await waitForDom(() => {
+                const submenu = document.querySelectorAll('menu, [role="menu"]')[1];
+                if (!submenu) return null;
+                for (const item of submenu.querySelectorAll('[role="menuitem"]')) {
+                    if (!matches((item.innerText || item.textContent || '').toLowerCase())) continue;
+                    const rect = item.getBoundingClientRect();
+                    if (rect.width > 0 && rect.height > 0) return item;
+                }
+                return null;
+            }, 2000);
+            if (!option) return { selected: false, step: 'option' };
+            option.click();
+            return { selected: true };
+        }
+    """)
+
+
+def select_grok_model_js() -> str:
+    """
+    JavaScript that opens the model menu, the "Models" submenu and clicks the
+    requested model in one evaluate(), waiting on DOM mutations between steps.
+    
+    Returns:
+        JavaScript code as string for use with page.evaluate(js, target_model_name)
+    """
+    return _SELECT_GROK_MODEL_JS
+
+
+_CLICK_DEEPSEARCH_BUTTON_JS = minify_js("""
+        () => {""" + _SCROLL_INTO_VIEW_JS + """
+            const buttons = document.querySelectorAll('button[data-slot="button"]');
+            for (const btn of buttons) {
+                const text = (btn.innerText || btn.textContent || '').trim();
+                if (text === 'DeepSearch' || text.toLowerCase() === 'deepsearch') {
+                    const rect = btn.getBoundingClientRect();
+                    if (rect.width > 0 && rect.height > 0) {
+                        scrollIntoViewIfNeeded(btn, rect);
+                        btn.click();
+                        return { clicked: true };
+                    }
+                }
+            }
+            return { clicked: false };
+        }
+    """)
+
+
+def click_deepsearch_button_js() -> str:
+    """
+    JavaScript to click the first visible DeepSearch button.
     
     Returns:
         JavaScript code as string for use with page.evaluate()
     """
-    return """
-        () => {
-            // Look for Private button/link by aria-label
-            const privateSelectors = [
+    return _CLICK_DEEPSEARCH_BUTTON_JS
+
+
+_CLICK_PRIVATE_BUTTON_JS = minify_js("""
+        () => {""" + _SCROLL_INTO_VIEW_JS + """
+            const selectors = [
                 'a[aria-label*="Switch to Private Chat" i]',
                 'a[aria-label*="Switch to Default Chat" i]',
                 'button[aria-label*="Switch to Private Chat" i]',
                 'button[aria-label*="Switch to Default Chat" i]',
                 'a[href*="#private"]',
-                'a:has-text("Private")',
-                'button:has-text("Private")',
             ];
-            
-            for (const selector of privateSelectors) {
-                try {
-                    const elements = Array.from(document.querySelectorAll(selector));
-                    for (const el of elements) {
-                        const text = (el.innerText || el.textContent || '').trim();
-                        if (text === 'Private' || text.toLowerCase() === 'private') {
-                            const rect = el.getBoundingClientRect();
-                            const style = window.getComputedStyle(el);
-                            const isVisible = rect.width > 0 && rect.height > 0 && 
-                                             el.offsetParent !== null &&
-                                             style.display !== 'none' &&
-                                             style.visibility !== 'hidden';
-                            
-                            if (isVisible) {
-                                const ariaLabel = el.getAttribute('aria-label') || '';
-                                const className = el.className || '';
-                                const href = el.getAttribute('href') || '';
-                                
-                                // Check if already in private mode (has purple color classes)
-                                const isPrivate = className.includes('text-purple-400') || 
-                                                 className.includes('text-purple-300') ||
-                                                 ariaLabel.includes('Switch to Default Chat');
-                                
-                                return {
-                                    found: true,
-                                    element: el.tagName,
-                                    text: text,
-                                    ariaLabel: ariaLabel,
-                                    href: href,
-                                    className: className.substring(0, 100),
-                                    isPrivate: isPrivate,
-                                    x: rect.x,
-                                    y: rect.y,
-                                    visible: isVisible
-                                };
-                            }
+
+            for (const selector of selectors) {
+                for (const el of document.querySelectorAll(selector)) {
+                    const text = (el.innerText || el.textContent || '').trim();
+                    if (text === 'Private' || text.toLowerCase() === 'private') {
+                        const rect = el.getBoundingClientRect();
+                        if (rect.width > 0 && rect.height > 0) {
+                            scrollIntoViewIfNeeded(el, rect);
+                            el.click();
+                            return { clicked: true };
                         }
                     }
-                } catch (e) {
-                    // Continue to next selector
                 }
             }
+            return { clicked: false };
+        }
+    """)
+
+
+def click_private_button_js() -> str:
+    """
+    JavaScript to click the visible Private / Default chat toggle.
+    
+    Returns:
+        JavaScript code as string for use with page.evaluate()
+    """
+    return _CLICK_PRIVATE_BUTTON_JS
+
+
+_SET_PRIVATE_MODE_JS = minify_js("""
+        async ([enable, timeoutMs]) => {""" + _WAIT_FOR_DOM_JS + """
+            const findButton = """ + _FIND_PRIVATE_BUTTON_JS + """;
+            const clickButton = """ + _CLICK_PRIVATE_BUTTON_JS + """;
+            const verifyMode = """ + _VERIFY_PRIVATE_MODE_JS + """;
+            
+            const button = findButton();
+            if (!button.found) return { found: false };
+            if (button.isPrivate === enable) {
+                return { found: true, clicked: false, isPrivate: button.isPrivate, ok: true };
+            }
             
-            return { found: false };
+            if (!clickButton().clicked) {
+                return { found: true, clicked: false, isPrivate: button.isPrivate, ok: false };
+            }
+            
+            // Wait for the toggle to settle in the requested state
+            const reached = await waitForDom(() => {
+                const state = verifyMode();
+                return state.found && state.isPrivate === enable;
+            }, timeoutMs);
+            const state = verifyMode();
+            return { found: true, clicked: true, verified: state.found, isPrivate: state.isPrivate, ok: !!reached };
         }
+    """)
+
+
+def set_private_mode_js() -> str:
     """
+    JavaScript that finds the Private toggle, clicks it if the mode differs
+    from the requested one and waits for the new state, in one evaluate().
+    
+    Returns:
+        JavaScript code as string for use with page.evaluate(js, [enable, timeout_ms])
+    """
+    return _SET_PRIVATE_MODE_JS
 
 
-def verify_private_mode_js() -> str:
+_FORCE_CLICK_ELEMENT_JS = minify_js("""
+        (element) => {
+            // Try to make element visible
+            const originalStyle = element.style.cssText;
+            element.style.display = 'block';
+            element.style.visibility = 'visible';
+            element.style.opacity = '1';
+
+            // Scroll into view
+            element.scrollIntoView({ behavior: 'instant', block: 'center' });
+
+            // Click using multiple methods
+            element.click();
+            element.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true }));
+            element.dispatchEvent(new PointerEvent('pointerdown', { bubbles: true, cancelable: true, pointerId: 1 }));
+            element.dispatchEvent(new PointerEvent('pointerup', { bubbles: true, cancelable: true, pointerId: 1 }));
+
+            // Restore original style
+            element.style.cssText = originalStyle;
+        }
+    """)
+
+
+def force_click_element_js() -> str:
     """
-    JavaScript to verify if Private mode is currently active.
+    JavaScript to click an element that is present but hidden, by making it
+    visible for the duration of the click.
+    
+    Returns:
+        JavaScript code as string for use with locator.evaluate()
+    """
+    return _FORCE_CLICK_ELEMENT_JS
+
+
+@lru_cache(maxsize=None)
+def wait_for_dom_predicate_js(predicate: str) -> str:
+    """
+    JavaScript that resolves once predicate(arg) is truthy, re-checking on
+    DOM mutations, or false after the timeout.
+    
+    Args:
+        predicate: Source of a JS function taking one optional argument
+    
+    Returns:
+        JavaScript code as string for use with page.evaluate(js, [timeout_ms, arg])
+    """
+    return minify_js("""
+        async ([timeoutMs, arg]) => {""" + _WAIT_FOR_DOM_JS + """
+            const predicate = """ + predicate + """;
+            return !!(await waitForDom(() => predicate(arg), timeoutMs));
+        }
+    """)
+
+
+_SESSION_STATE_JS = minify_js("""
+        () => ({
+            deepsearch: (""" + _VERIFY_DEEPSEARCH_ENABLED_JS + """)(),
+            private: (""" + _VERIFY_PRIVATE_MODE_JS + """)(),
+            modelText: (document.querySelector('#model-select-trigger') || {}).innerText || ''
+        })
+    """)
+
+
+def session_state_js() -> str:
+    """
+    JavaScript that reads the DeepSearch, Private mode and model selector
+    state in one evaluate().
     
     Returns:
         JavaScript code as string for use with page.evaluate()
     """
-    return """
+    return _SESSION_STATE_JS
+
+
+# Stop generation button, shown while a response is being generated
+STOP_BUTTON_SELECTOR = (
+    "div.h-10.aspect-square.flex.flex-col.items-center.justify-center"
+    ".rounded-full.ring-1.ring-inset.bg-button-filled.text-fg-invert"
+)
+
+_STOP_BUTTON_VISIBLE_JS = minify_js("""
         () => {
-            // Look for Private button and check its state
-            const privateSelectors = [
-                'a[aria-label*="Private Chat" i], a[aria-label*="Default Chat" i]',
-                'button[aria-label*="Private Chat" i], button[aria-label*="Default Chat" i]',
-                'a:has-text("Private"), button:has-text("Private")',
-            ];
-            
-            for (const selector of privateSelectors) {
-                try {
-                    const elements = Array.from(document.querySelectorAll(selector));
-                    for (const el of elements) {
-                        const text = (el.innerText || el.textContent || '').trim();
-                        if (text === 'Private' || text.toLowerCase() === 'private') {
-                            const ariaLabel = el.getAttribute('aria-label') || '';
-                            const className = el.className || '';
-                            
-                            // Private mode is active if:
-                            // 1. Has purple color classes
-                            // 2. aria-label says "Switch to Default Chat" (meaning we're in private, can switch to default)
-                            const isPrivate = className.includes('text-purple-400') || 
-                                           className.includes('text-purple-300') ||
-                                           ariaLabel.includes('Switch to Default Chat');
-                            
-                            return {
-                                found: true,
-                                isPrivate: isPrivate,
-                                ariaLabel: ariaLabel,
-                                className: className.substring(0, 100)
-                            };
-                        }
-                    }
-                } catch (e) {
-                    // Continue
+            // Only the elements carrying all the button classes are checked
+            for (const btn of document.querySelectorAll(""" + json.dumps(STOP_BUTTON_SELECTOR) + """)) {
+                const rect = btn.getBoundingClientRect();
+                const style = window.getComputedStyle(btn);
+                if (rect.width > 0 && rect.height > 0 &&
+                    btn.offsetParent !== null &&
+                    style.display !== 'none' &&
+                    style.visibility !== 'hidden') {
+                    return true;
                 }
             }
-            
-            return { found: false, isPrivate: false };
+            return false;
         }
+    """)
+
+
+def stop_button_visible_js() -> str:
+    """
+    JavaScript to check whether the stop generation button is visible.
+    
+    Returns:
+        JavaScript code as string for use with page.evaluate()
+    """
+    return _STOP_BUTTON_VISIBLE_JS
+
+
+_EXTRACT_RESPONSE_JS = minify_js("""
+        () => {
+            // Find the main chat container first
+            const main = document.querySelector('main');
+            if (!main) return '';
+
+            // One query for both kinds of container: markdown/prose content
+            // (Grok responses are usually in markdown) and, as a fallback,
+            // article/role containers. The input area itself and anything
+            // inside it are excluded by the selector (like closest() would).
+            const MARKDOWN = 'div[class*="markdown"], pre[class*="markdown"], [class*="prose"]';
+            const MARKDOWN_INPUT = 'form, textarea, [contenteditable="true"]';
+            const ARTICLE_INPUT = 'form, textarea';
+            const containers = main.querySelectorAll(
+                ':is(' + MARKDOWN + '):not(:is(' + MARKDOWN_INPUT + ')):not(:is(' + MARKDOWN_INPUT + ') *), ' +
+                ':is([role="article"], article):not(:is(' + ARTICLE_INPUT + ')):not(:is(' + ARTICLE_INPUT + ') *)'
+            );
+            const uiTexts = ['Private', 'Auto', 'DeepSearch', 'Create Image', 'Pick Personas', 'Voice', 'What do you want to know?'];
+            // Candidates are compared on textContent, which needs no layout;
+            // innerText (line breaks as rendered) is read once, for the winner
+            let best = null;
+            let bestLength = 0;
+            const articles = [];
+
+            for (const el of containers) {
+                if (!el.matches(MARKDOWN)) {
+                    articles.push(el);
+                    continue;
+                }
+                const text = (el.textContent || '').trim();
+                if (text.length <= 50 || text.length <= bestLength) continue;
+                if (text.includes('What do you want to know?')) continue;
+                best = el;
+                bestLength = text.length;
+            }
+
+            // Fallback only when no markdown/prose container qualified
+            if (!best) {
+                for (const el of articles) {
+                    const text = (el.textContent || '').trim();
+                    if (text.length <= 50 || text.length <= bestLength) continue;
+                    if (uiTexts.some(ui => text.includes(ui))) continue;
+                    best = el;
+                    bestLength = text.length;
+                }
+            }
+
+            return best ? (best.innerText || best.textContent || '').trim() : '';
+        }
+    """)
+
+
+def extract_response_js() -> str:
+    """
+    JavaScript to extract the longest response text from the chat.
+    
+    Returns:
+        JavaScript code as string for use with page.evaluate()
     """
+    return _EXTRACT_RESPONSE_JS
@@ -1,17 +1,51 @@
 """
 Popup and modal handler utilities for closing advertisements and overlays
 """
-from typing import Optional, Dict, Any
+import json
+import time
+from typing import TYPE_CHECKING, Optional, Dict, Any
 
+from .js_utils import minify_js
 
-def close_popups_js() -> str:
-    """
-    JavaScript to close various types of popups, modals, and advertisements.
-    
-    Returns:
-        JavaScript code as string for use with page.evaluate()
-    """
-    return """
+if TYPE_CHECKING:
+    from playwright.sync_api import Page
+
+# Attribute selectors use the "i" flag instead of listing case variants.
+# Only standard CSS here: one invalid entry would make the joined query throw.
+_CLOSE_BUTTON_SELECTORS = [
+    'button[aria-label*="close" i]',
+    'button[aria-label*="dismiss" i]',
+    '[role="button"][aria-label*="close" i]',
+    'button:has(svg[aria-label*="close" i])',
+    # Common close button patterns
+    'button.close',
+    'button[class*="close"]',
+    '[class*="close-button"]',
+    '[class*="CloseButton"]',
+    # X icon buttons
+    'svg[aria-label*="close" i]',
+]
+
+# Button texts that mean "close"
+_CLOSE_GLYPHS = ['×', '✕', '✖']
+
+_MODAL_SELECTORS = [
+    '[role="dialog"]',
+    'dialog',
+    '[class*="modal" i]',
+    '[class*="popup" i]',
+    '[class*="overlay" i]',
+    '[class*="backdrop" i]',
+    '[class*="announcement" i]',
+    '[class*="promo" i]',
+]
+
+_BACKDROP_SELECTORS = [
+    '[class*="backdrop" i]',
+    '[class*="overlay" i]',
+]
+
+_CLOSE_POPUPS_JS = minify_js("""
         () => {
             const results = {
                 closed: false,
@@ -19,216 +53,205 @@ def close_popups_js() -> str:
                 elementsFound: []
             };
             
+            // Viewport size is read once; every strategy below compares against it
+            const vw = window.innerWidth, vh = window.innerHeight;
+            
+            // Layout cannot change within this synchronous pass until we click,
+            // and every click is followed by a return, so measure each element once
+            const rectCache = new WeakMap(), styleCache = new WeakMap();
+            const getRect = (el) => {
+                let rect = rectCache.get(el);
+                if (!rect) {
+                    rect = el.getBoundingClientRect();
+                    rectCache.set(el, rect);
+                }
+                return rect;
+            };
+            const getStyle = (el) => {
+                let style = styleCache.get(el);
+                if (!style) {
+                    style = window.getComputedStyle(el);
+                    styleCache.set(el, style);
+                }
+                return style;
+            };
+            
+            // Selector lists are joined in Python so each strategy is one querySelectorAll;
+            // the matching entry is only looked up for the element that gets closed
+            const matchedSelector = (el, selectors) => selectors.find(sel => el.matches(sel)) || null;
+            
             // Strategy 1: Look for close buttons (X buttons) in common locations
-            const closeButtonSelectors = [
-                'button[aria-label*="close" i]',
-                'button[aria-label*="Close" i]',
-                'button[aria-label*="dismiss" i]',
-                'button[aria-label*="Dismiss" i]',
-                '[role="button"][aria-label*="close" i]',
-                '[role="button"][aria-label*="Close" i]',
-                'button:has(svg[aria-label*="close" i])',
-                'button:has(svg[aria-label*="Close" i])',
-                // Common close button patterns
-                'button.close',
-                'button[class*="close"]',
-                '[class*="close-button"]',
-                '[class*="CloseButton"]',
-                // X icon buttons
-                'svg[aria-label*="close" i]',
-                'svg[aria-label*="Close" i]',
-                // Look for buttons with X text or close icon
-                'button:has-text("×")',
-                'button:has-text("✕")',
-                'button:has-text("✖")',
-            ];
+            const closeButtonSelectors = """ + json.dumps(_CLOSE_BUTTON_SELECTORS) + """;
+            const closeButtons = [...document.querySelectorAll(""" + json.dumps(', '.join(_CLOSE_BUTTON_SELECTORS)) + """)];
+            // Look for buttons with X text (matched on textContent; :has-text() is not CSS)
+            const closeGlyphs = """ + json.dumps(_CLOSE_GLYPHS, ensure_ascii=False) + """;
+            for (const btn of document.querySelectorAll('button')) {
+                if (closeGlyphs.includes(btn.textContent.trim())) closeButtons.push(btn);
+            }
+            // A page-lifetime IntersectionObserver tracks whether each candidate is in
+            // the viewport; later calls read that state instead of doing rect math.
+            // Elements it has not reported on yet fall back to the rect check.
+            const popupIO = window.__grokPopupIO || (window.__grokPopupIO = { inViewport: new WeakMap(), observer: null });
+            if (!popupIO.observer && typeof IntersectionObserver !== 'undefined') {
+                popupIO.observer = new IntersectionObserver((entries) => {
+                    for (const entry of entries) popupIO.inViewport.set(entry.target, entry.isIntersecting);
+                });
+            }
+            const knownInViewport = (el) => {
+                if (popupIO.observer) popupIO.observer.observe(el);
+                return popupIO.inViewport.get(el);
+            };
             
-            for (const selector of closeButtonSelectors) {
-                try {
-                    const buttons = Array.from(document.querySelectorAll(selector));
-                    for (const btn of buttons) {
-                        const rect = btn.getBoundingClientRect();
-                        const style = window.getComputedStyle(btn);
-                        // Check if button is visible and in viewport
-                        if (rect.width > 0 && rect.height > 0 && 
-                            btn.offsetParent !== null &&
-                            style.display !== 'none' &&
-                            style.visibility !== 'hidden' &&
-                            rect.top >= 0 && rect.left >= 0 &&
-                            rect.top < window.innerHeight &&
-                            rect.left < window.innerWidth) {
-                            
-                            // Check if it's in a modal/popup (not just any close button)
-                            let parent = btn.parentElement;
-                            let isInModal = false;
-                            let depth = 0;
-                            while (parent && depth < 5) {
-                                const parentClass = parent.className || '';
-                                const parentTag = parent.tagName || '';
-                                // Check for modal/popup indicators
-                                if (parentClass.includes('modal') ||
-                                    parentClass.includes('popup') ||
-                                    parentClass.includes('overlay') ||
-                                    parentClass.includes('dialog') ||
-                                    parentClass.includes('backdrop') ||
-                                    parent.getAttribute('role') === 'dialog' ||
-                                    parentTag === 'DIALOG') {
-                                    isInModal = true;
-                                    break;
-                                }
-                                parent = parent.parentElement;
-                                depth++;
-                            }
-                            
-                            // Also check if button is in top-right corner (common for close buttons)
-                            const isTopRight = rect.top < 100 && rect.left > window.innerWidth - 150;
-                            
-                            if (isInModal || isTopRight) {
-                                btn.scrollIntoView({ behavior: 'instant', block: 'center' });
-                                btn.click();
-                                btn.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true }));
-                                results.closed = true;
-                                results.methods.push('close-button-click');
-                                results.elementsFound.push({
-                                    type: 'close-button',
-                                    selector: selector,
-                                    position: { top: rect.top, left: rect.left }
-                                });
-                                return results; // Return immediately after closing
-                            }
+            for (const btn of closeButtons) {
+                // Off-screen buttons are skipped without any layout read
+                const inViewportState = knownInViewport(btn);
+                if (inViewportState === false) continue;
+                const rect = getRect(btn);
+                const style = getStyle(btn);
+                const inViewport = inViewportState === true ||
+                    (rect.top >= 0 && rect.left >= 0 && rect.top < vh && rect.left < vw);
+                // Check if button is visible and in viewport
+                if (rect.width > 0 && rect.height > 0 && 
+                    style.display !== 'none' &&
+                    style.visibility !== 'hidden' &&
+                    inViewport) {
+                    
+                    // Check if it's in a modal/popup (not just any close button)
+                    const modalClassRe = /modal|popup|overlay|dialog|backdrop/;
+                    let parent = btn.parentElement;
+                    let isInModal = false;
+                    let depth = 0;
+                    while (parent && depth < 5) {
+                        // Each attribute is read once per ancestor; the tag needs no attribute lookup
+                        const parentClass = parent.getAttribute('class') || '';
+                        const parentRole = parent.getAttribute('role');
+                        // Check for modal/popup indicators
+                        if (parent.tagName === 'DIALOG' ||
+                            parentRole === 'dialog' ||
+                            modalClassRe.test(parentClass)) {
+                            isInModal = true;
+                            break;
                         }
+                        parent = parent.parentElement;
+                        depth++;
+                    }
+                    
+                    // Also check if button is in top-right corner (common for close buttons)
+                    const isTopRight = rect.top < 100 && rect.left > vw - 150;
+                    
+                    if (isInModal || isTopRight) {
+                        btn.scrollIntoView({ behavior: 'instant', block: 'center' });
+                        btn.click();
+                        results.closed = true;
+                        results.methods.push('close-button-click');
+                        results.elementsFound.push({
+                            type: 'close-button',
+                            selector: matchedSelector(btn, closeButtonSelectors) || 'button text ' + btn.textContent.trim(),
+                            position: { top: rect.top, left: rect.left }
+                        });
+                        return results; // Return immediately after closing
                     }
-                } catch (e) {
-                    // Continue to next selector
                 }
             }
             
             // Strategy 2: Look for modal/popup containers and try to close them
-            const modalSelectors = [
-                '[role="dialog"]',
-                'dialog',
-                '[class*="modal"]',
-                '[class*="Modal"]',
-                '[class*="popup"]',
-                '[class*="Popup"]',
-                '[class*="overlay"]',
-                '[class*="Overlay"]',
-                '[class*="backdrop"]',
-                '[class*="Backdrop"]',
-                '[class*="announcement"]',
-                '[class*="Announcement"]',
-                '[class*="promo"]',
-                '[class*="Promo"]',
-            ];
-            
-            for (const selector of modalSelectors) {
-                try {
-                    const modals = Array.from(document.querySelectorAll(selector));
-                    for (const modal of modals) {
-                        const rect = modal.getBoundingClientRect();
-                        const style = window.getComputedStyle(modal);
-                        // Check if modal is visible and covers significant portion of screen
-                        if (rect.width > 200 && rect.height > 200 &&
-                            modal.offsetParent !== null &&
-                            style.display !== 'none' &&
-                            style.visibility !== 'hidden' &&
-                            (rect.top < window.innerHeight / 2 || 
-                             rect.width > window.innerWidth * 0.5)) {
-                            
-                            // Try to find close button within this modal
-                            const closeBtn = modal.querySelector('button[aria-label*="close" i], button[aria-label*="Close" i], [class*="close"]');
-                            if (closeBtn) {
-                                closeBtn.click();
-                                closeBtn.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true }));
-                                results.closed = true;
-                                results.methods.push('modal-close-button');
-                                results.elementsFound.push({
-                                    type: 'modal',
-                                    selector: selector,
-                                    size: { width: rect.width, height: rect.height }
-                                });
-                                return results;
-                            }
-                            
-                            // Try pressing Escape key on the modal
-                            const escapeEvent = new KeyboardEvent('keydown', {
-                                key: 'Escape',
-                                code: 'Escape',
-                                keyCode: 27,
-                                bubbles: true,
-                                cancelable: true
-                            });
-                            modal.dispatchEvent(escapeEvent);
-                            results.closed = true;
-                            results.methods.push('escape-key');
-                            results.elementsFound.push({
-                                type: 'modal',
-                                selector: selector,
-                                method: 'escape'
-                            });
-                            return results;
-                        }
+            const modalSelectors = """ + json.dumps(_MODAL_SELECTORS) + """;
+            for (const modal of document.querySelectorAll(""" + json.dumps(', '.join(_MODAL_SELECTORS)) + """)) {
+                const rect = getRect(modal);
+                const style = getStyle(modal);
+                // Check if modal is visible and covers significant portion of screen
+                if (rect.width > 200 && rect.height > 200 &&
+                    style.display !== 'none' &&
+                    style.visibility !== 'hidden' &&
+                    (rect.top < vh / 2 || 
+                     rect.width > vw * 0.5)) {
+                    
+                    // Try to find close button within this modal
+                    const closeBtn = modal.querySelector('button[aria-label*="close" i], [class*="close"]');
+                    if (closeBtn) {
+                        closeBtn.click();
+                        results.closed = true;
+                        results.methods.push('modal-close-button');
+                        results.elementsFound.push({
+                            type: 'modal',
+                            selector: matchedSelector(modal, modalSelectors),
+                            size: { width: rect.width, height: rect.height }
+                        });
+                        return results;
                     }
-                } catch (e) {
-                    // Continue to next selector
+                    
+                    // Try pressing Escape key on the modal
+                    const escapeEvent = new KeyboardEvent('keydown', {
+                        key: 'Escape',
+                        code: 'Escape',
+                        keyCode: 27,
+                        bubbles: true,
+                        cancelable: true
+                    });
+                    modal.dispatchEvent(escapeEvent);
+                    results.closed = true;
+                    results.methods.push('escape-key');
+                    results.elementsFound.push({
+                        type: 'modal',
+                        selector: matchedSelector(modal, modalSelectors),
+                        method: 'escape'
+                    });
+                    return results;
                 }
             }
             
             // Strategy 3: Click on backdrop/overlay to close (common pattern)
-            const backdropSelectors = [
-                '[class*="backdrop"]',
-                '[class*="Backdrop"]',
-                '[class*="overlay"]',
-                '[class*="Overlay"]',
-                '[class*="modal-backdrop"]',
-            ];
-            
-            for (const selector of backdropSelectors) {
-                try {
-                    const backdrops = Array.from(document.querySelectorAll(selector));
-                    for (const backdrop of backdrops) {
-                        const rect = backdrop.getBoundingClientRect();
-                        const style = window.getComputedStyle(backdrop);
-                        // Check if backdrop is visible and covers screen
-                        if (rect.width > window.innerWidth * 0.8 &&
-                            rect.height > window.innerHeight * 0.8 &&
-                            backdrop.offsetParent !== null &&
-                            style.display !== 'none') {
-                            
-                            // Click on backdrop (usually closes modal)
-                            backdrop.click();
-                            backdrop.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true }));
-                            results.closed = true;
-                            results.methods.push('backdrop-click');
-                            results.elementsFound.push({
-                                type: 'backdrop',
-                                selector: selector
-                            });
-                            return results;
-                        }
-                    }
-                } catch (e) {
-                    // Continue
+            const backdropSelectors = """ + json.dumps(_BACKDROP_SELECTORS) + """;
+            for (const backdrop of document.querySelectorAll(""" + json.dumps(', '.join(_BACKDROP_SELECTORS)) + """)) {
+                const rect = getRect(backdrop);
+                const style = getStyle(backdrop);
+                // Check if backdrop is visible and covers screen
+                if (rect.width > vw * 0.8 &&
+                    rect.height > vh * 0.8 &&
+                    style.display !== 'none') {
+                    
+                    // Click on backdrop (usually closes modal)
+                    backdrop.click();
+                    results.closed = true;
+                    results.methods.push('backdrop-click');
+                    results.elementsFound.push({
+                        type: 'backdrop',
+                        selector: matchedSelector(backdrop, backdropSelectors)
+                    });
+                    return results;
                 }
             }
             
             // Strategy 4: Look for elements with "Grok 4.1" or similar announcement text
             // (Based on the popup shown in the image)
-            const allElements = Array.from(document.querySelectorAll('*'));
-            for (const el of allElements) {
-                const text = (el.innerText || el.textContent || '').trim();
+            // Read phase: find the popup container around announcement text.
+            // Only class/rect reads happen here, so layout is computed at most once.
+            // Walk text nodes only: nodeValue needs no layout, unlike innerText
+            let announcement = null;
+            const announcementRe = /Introducing Grok|Grok 4\.1|Try Now/;
+            // Inline script/style text (e.g. serialized page data) is not visible UI
+            const skippedParents = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT']);
+            const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT, {
+                acceptNode: (node) => node.parentElement && skippedParents.has(node.parentElement.tagName)
+                    ? NodeFilter.FILTER_REJECT
+                    : NodeFilter.FILTER_ACCEPT
+            });
+            // A real announcement puts its phrases close together; if the first two
+            // matches are not inside a popup container, later ones will not be either
+            let matches = 0;
+            for (let node = walker.nextNode(); node && !announcement && matches < 2; node = walker.nextNode()) {
+                const text = node.nodeValue.trim();
                 // Look for announcement/promo text
-                if (text.includes('Introducing Grok') ||
-                    text.includes('Grok 4.1') ||
-                    text.includes('Try Now') ||
+                if (announcementRe.test(text) ||
                     (text.includes('Read full announcement') && text.length < 200)) {
+                    matches++;
                     
                     // Find parent modal/container
-                    let container = el.parentElement;
+                    let container = node.parentElement;
                     let depth = 0;
                     while (container && depth < 10) {
-                        const containerClass = container.className || '';
-                        const containerRect = container.getBoundingClientRect();
+                        const containerClass = container.getAttribute('class') || '';
+                        const containerRect = getRect(container);
                         
                         // Check if this looks like a popup container
                         if ((containerClass.includes('modal') ||
@@ -236,33 +259,8 @@ def close_popups_js() -> str:
                              containerClass.includes('dialog') ||
                              containerRect.width > 300) &&
                             containerRect.width > 200 && containerRect.height > 200) {
-                            
-                            // Look for close button in this container
-                            const closeBtn = container.querySelector('button[aria-label*="close" i], [class*="close"], svg[aria-label*="close" i]');
-                            if (closeBtn) {
-                                closeBtn.click();
-                                closeBtn.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true }));
-                                results.closed = true;
-                                results.methods.push('announcement-close');
-                                results.elementsFound.push({
-                                    type: 'announcement',
-                                    text: text.substring(0, 50)
-                                });
-                                return results;
-                            }
-                            
-                            // Try Escape key
-                            const escapeEvent = new KeyboardEvent('keydown', {
-                                key: 'Escape',
-                                code: 'Escape',
-                                keyCode: 27,
-                                bubbles: true,
-                                cancelable: true
-                            });
-                            container.dispatchEvent(escapeEvent);
-                            results.closed = true;
-                            results.methods.push('announcement-escape');
-                            return results;
+                            announcement = { container: container, text: text };
+                            break;
                         }
                         container = container.parentElement;
                         depth++;
@@ -270,76 +268,82 @@ def close_popups_js() -> str:
                 }
             }
             
+            // Write phase: exactly one close click or Escape
+            if (announcement) {
+                const container = announcement.container;
+                
+                // Look for close button in this container
+                const closeBtn = container.querySelector('button[aria-label*="close" i], [class*="close"], svg[aria-label*="close" i]');
+                if (closeBtn) {
+                    closeBtn.click();
+                    results.closed = true;
+                    results.methods.push('announcement-close');
+                    results.elementsFound.push({
+                        type: 'announcement',
+                        text: announcement.text.substring(0, 50)
+                    });
+                    return results;
+                }
+                
+                // Try Escape key
+                const escapeEvent = new KeyboardEvent('keydown', {
+                    key: 'Escape',
+                    code: 'Escape',
+                    keyCode: 27,
+                    bubbles: true,
+                    cancelable: true
+                });
+                container.dispatchEvent(escapeEvent);
+                results.closed = true;
+                results.methods.push('announcement-escape');
+                return results;
+            }
+            
             return results;
         }
+    """)
+
+
+def close_popups_js() -> str:
+    """
+    JavaScript to close various types of popups, modals, and advertisements.
+    
+    Returns:
+        JavaScript code as string for use with page.evaluate()
     """
+    return _CLOSE_POPUPS_JS
 
 
 def wait_and_close_popups_js() -> str:
     """
-    JavaScript to wait for popups to appear and then close them.
-    Useful when popups appear after a delay.
+    JavaScript for a single attempt at closing a popup that appears late.
+    This is the close_popups_js() script; use wait_and_close_popups() to poll it.
     
     Returns:
         JavaScript code as string for use with page.evaluate()
     """
-    return """
-        () => {
-            const maxWait = 2000; // 2 seconds
-            const checkInterval = 100; // Check every 100ms
-            let elapsed = 0;
-            
-            while (elapsed < maxWait) {
-                const result = (function() {
-                    // Use the same logic as close_popups_js
-                    const closeButtonSelectors = [
-                        'button[aria-label*="close" i]',
-                        'button[aria-label*="Close" i]',
-                        '[class*="close-button"]',
-                        'svg[aria-label*="close" i]',
-                    ];
-                    
-                    for (const selector of closeButtonSelectors) {
-                        const buttons = Array.from(document.querySelectorAll(selector));
-                        for (const btn of buttons) {
-                            const rect = btn.getBoundingClientRect();
-                            const style = window.getComputedStyle(btn);
-                            if (rect.width > 0 && rect.height > 0 && 
-                                btn.offsetParent !== null &&
-                                style.display !== 'none' &&
-                                rect.top < 100 && rect.left > window.innerWidth - 150) {
-                                
-                                btn.click();
-                                return { closed: true, method: 'close-button' };
-                            }
-                        }
-                    }
-                    
-                    // Check for modals
-                    const modals = Array.from(document.querySelectorAll('[role="dialog"], dialog, [class*="modal"], [class*="popup"]'));
-                    for (const modal of modals) {
-                        const rect = modal.getBoundingClientRect();
-                        if (rect.width > 200 && rect.height > 200) {
-                            const closeBtn = modal.querySelector('button[aria-label*="close" i], [class*="close"]');
-                            if (closeBtn) {
-                                closeBtn.click();
-                                return { closed: true, method: 'modal-close' };
-                            }
-                        }
-                    }
-                    
-                    return { closed: false };
-                })();
-                
-                if (result.closed) {
-                    return result;
-                }
-                
-                elapsed += checkInterval;
-                // Note: Actual waiting will be done in Python with time.sleep()
-            }
-            
-            return { closed: false, timeout: true };
-        }
-    """
+    return _CLOSE_POPUPS_JS
+
 
+def wait_and_close_popups(page: "Page", timeout: float = 2.0, interval: float = 0.1) -> Dict[str, Any]:
+    """
+    Wait for a popup to appear and close it.
+    Useful when popups appear after a delay.
+    
+    Args:
+        page: Playwright page
+        timeout: Maximum seconds to wait for a popup
+        interval: Seconds to wait between checks
+    
+    Returns:
+        close_popups_js() result ('closed', 'methods', 'elementsFound'),
+        or 'timeout' if nothing was closed
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        result = page.evaluate(_CLOSE_POPUPS_JS)
+        if result.get('closed'):
+            return result
+        if time.monotonic() + interval > deadline:
+            return {'closed': False, 'timeout': True}
+        time.sleep(interval)
@@ -1,19 +1,37 @@
 """
 Browser automation for Grok.com using Playwright
 """
+import json
 import logging
 import os
-import platform
 import time
-from typing import TYPE_CHECKING, Any, Dict, Optional
+import traceback
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
+from .browser_pool import BrowserPool, get_browser_pool
+from .driver_config import (
+    BASE_CONTEXT_OPTIONS,
+    BLOCKED_RESOURCE_TYPES,
+    BLOCKED_RESOURCE_URL_RE,
+    CHAT_INPUT_SELECTOR,
+    DEEPSEARCH_ENABLED_PREDICATE_JS,
+    GROK_MODEL_NAMES,
+    MODEL_TEXT_MAP,
+    STEALTH_HEADERS,
+    STEALTH_INIT_SCRIPT,
+    STEALTH_USER_AGENT,
+    build_cookie_list,
+    build_launch_options,
+    filter_response_text,
+    model_text_matches,
+)
+from .js_api import evaluate_js_api, register_automation_helpers
 from .js_utils import (
-    verify_deepsearch_enabled_js,
-    find_private_button_js,
-    verify_private_mode_js
+    STOP_BUTTON_SELECTOR,
+    force_click_element_js,
+    minify_js,
+    wait_for_dom_predicate_js,
 )
-from .page_verification import verify_grok_homepage_js
-from .popup_handler import close_popups_js
 
 logger = logging.getLogger(__name__)
 logging.getLogger("playwright").setLevel(logging.WARNING)
@@ -32,7 +50,7 @@ try:
         BrowserContext,
         Page,
         Playwright,
-        sync_playwright,
+        TimeoutError as PlaywrightTimeoutError,
     )
     PLAYWRIGHT_AVAILABLE = True
 except ImportError:
@@ -44,9 +62,173 @@ except ImportError:
         Playwright = None  # type: ignore
 
 
+# Login status: URL, chat input visibility/enabled state, focus test and
+# header login-button heuristic
+_LOGIN_CHECK_JS = minify_js("""
+        () => {
+            // Check URL
+            if (window.location.href.includes('sign-in') || 
+                window.location.href.includes('sign-up') || 
+                window.location.href.includes('accounts.x.ai')) {
+                return { loggedIn: false, reason: 'redirected_to_login' };
+            }
+            
+            // Check for chat input - try multiple selectors
+            const selectors = [
+                'textarea[aria-label*="Ask Grok"]',
+                'textarea[aria-label*="Ask"]',
+                'textarea',
+                '[contenteditable="true"]',
+                'input[type="text"]'
+            ];
+            
+            // The first visible, enabled input settles it; otherwise keep the
+            // first input found for the detailed checks below
+            let chatInput = null;
+            let foundSelector = null;
+            for (const selector of selectors) {
+                const input = document.querySelector(selector);
+                if (!input) continue;
+                const rect = input.getBoundingClientRect();
+                if (rect.width > 0 && rect.height > 0 && !input.disabled && !input.readOnly) {
+                    return { loggedIn: true, reason: 'has_chat_input_can_interact', foundSelector: selector };
+                }
+                if (!chatInput) {
+                    chatInput = input;
+                    foundSelector = selector;
+                }
+            }
+            
+            if (!chatInput) {
+                return { loggedIn: false, reason: 'no_chat_input_found' };
+            }
+            
+            // Check if input is visible and enabled
+            const rect = chatInput.getBoundingClientRect();
+            const isVisible = rect.width > 0 && rect.height > 0;
+            const isEnabled = !chatInput.disabled && !chatInput.readOnly;
+            
+            if (!isVisible) {
+                return { loggedIn: false, reason: 'chat_input_not_visible' };
+            }
+            
+            if (!isEnabled) {
+                return { loggedIn: false, reason: 'chat_input_disabled' };
+            }
+            
+            // Check for visible login buttons in header/nav (not footer)
+            // Be more strict - only count as login button if it's clearly a login button
+            // Sign-in/sign-up links are identified by href, so generic buttons are
+            // not scanned; stop at the first visible one
+            const loginScope = document.querySelector('header, nav') || document.body;
+            const loginLinks = loginScope.querySelectorAll('a[href*="sign-in"], a[href*="login"], a[href*="sign-up"]');
+            let visibleLogin = false;
+            for (const link of loginLinks) {
+                const href = (link.href || '').toLowerCase();
+                const linkText = (link.textContent || '').toLowerCase().trim();
+                
+                // Must have clear login/sign-in text or href
+                if (!(href.includes('sign-in') || href.includes('sign-up') || href.includes('/login') ||
+                      linkText === 'sign in' || linkText === 'login' || linkText === 'sign up')) {
+                    continue;
+                }
+                
+                // Must be in top portion of page (header area)
+                const linkRect = link.getBoundingClientRect();
+                if (linkRect.top < 300 && linkRect.height > 0) {
+                    visibleLogin = true;
+                    break;
+                }
+            }
+            
+            // Also check if we can actually interact with the chat input
+            // Try to focus it - if we can, we're likely logged in
+            let canInteract = false;
+            try {
+                chatInput.focus();
+                canInteract = document.activeElement === chatInput;
+            } catch (e) {
+                // Can't focus, might not be logged in
+            }
+            
+            // If we have chat input and can interact with it, we're logged in
+            // Even if there are login buttons visible, if we can interact with chat, we're logged in
+            // (Some pages show login buttons even when logged in)
+            // Also check if the input is actually usable (not just present)
+            const isUsable = isVisible && isEnabled && canInteract;
+            const loggedIn = isUsable || (!visibleLogin && chatInput && isVisible && isEnabled);
+            return { 
+                loggedIn: loggedIn, 
+                reason: loggedIn ? 'has_chat_input_can_interact' : (visibleLogin ? 'has_login_buttons' : (isVisible ? 'input_not_enabled' : 'input_not_visible')),
+                foundSelector: foundSelector,
+                hasLoginButtons: visibleLogin,
+                canInteract: canInteract,
+                isVisible: isVisible,
+                isEnabled: isEnabled
+            };
+        }
+""")
+
+_CHAT_INPUT_VISIBLE_JS = minify_js("""
+        () => {
+            for (const el of document.querySelectorAll(""" + json.dumps(CHAT_INPUT_SELECTOR) + """)) {
+                const rect = el.getBoundingClientRect();
+                if (rect.width > 0 && rect.height > 0) return true;
+            }
+            return false;
+        }
+    """)
+
+
+def _abort_blocked_resource(route: Any) -> None:
+    """Route handler: abort matched images/fonts/media, let anything else through"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
+
+
+# Seconds wait_for_login() waits for the redirect before it starts polling
+_LOGIN_REDIRECT_WAIT = 5
+
+# Longest pause between stop-button checks with poll_response=True
+_STOP_BUTTON_POLL_MAX_INTERVAL = 2.0
+
+# Wrapper-managed Chrome profile used with reuse_profile=True when no
+# user_data_dir is given; it holds auth cookies, so it lives in the user's own
+# cache directory and is created private to the user
+_DEFAULT_PROFILE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "grok_wrapper",
+    "profile",
+)
+
+# Post-click states awaited with GrokWebDriver._wait_for_dom_predicate()
+_SUBMENU_OPEN_PREDICATE_JS = """() => document.querySelectorAll('menu, [role="menu"]').length >= 2"""
+_MENU_CLOSED_PREDICATE_JS = """() => !document.querySelector('[role="menu"]')"""
+
+_MODEL_TRIGGER_TEXT_JS = "() => { const el = document.querySelector('#model-select-trigger'); return el ? el.innerText || '' : ''; }"
+
+# Exact submenu option for a model name; "Grok 4.1" excludes "Grok 4.1 Thinking"
+_FIND_SUBMENU_MODEL_ITEM_JS = minify_js("""
+    (submenu, targetName) => {
+        const wanted = targetName.toLowerCase();
+        for (const item of submenu.querySelectorAll('[role="menuitem"]')) {
+            const text = (item.innerText || item.textContent || '').toLowerCase();
+            const matches = wanted === 'grok 4.1'
+                ? text.includes('grok 4.1') && !text.includes('thinking')
+                : text.includes(wanted);
+            if (matches) return item;
+        }
+        return null;
+    }
+""")
+
 class GrokWebDriver:
     """Browser automation for Grok.com using Playwright"""
-    _platform_system = platform.system()
+    # One Browser per launch configuration, shared by every driver; each
+    # instance owns only its BrowserContext and Page
+    _browser_pool: BrowserPool = get_browser_pool()
 
     def __init__(
         self,
@@ -54,6 +236,10 @@ class GrokWebDriver:
         user_data_dir: Optional[str] = None,
         stealth_mode: bool = True,
         debug_mode: bool = False,
+        cdp_endpoint: Optional[str] = None,
+        block_resources: bool = False,
+        reuse_profile: bool = False,
+        poll_response: bool = False,
     ):
         if not PLAYWRIGHT_AVAILABLE:
             raise ImportError(
@@ -64,126 +250,61 @@ class GrokWebDriver:
         self.user_data_dir = user_data_dir
         self.stealth_mode = stealth_mode
         self.debug_mode = debug_mode
+        # Attach to an already running Chrome instead of launching one
+        self.cdp_endpoint = cdp_endpoint or os.environ.get("GROK_CDP_ENDPOINT") or None
+        # Opt-in: abort image/font/media downloads the automation never looks
+        # at. Any context.route() makes Playwright bypass the HTTP cache, so
+        # Grok's JS/CSS bundles are then fetched again on every navigation
+        self.block_resources = block_resources
+        # Opt-in: without an explicit user_data_dir, keep a wrapper-managed
+        # profile so Cloudflare clearance persists across sessions
+        self.reuse_profile = reuse_profile
+        # Detect the end of generation by polling instead of Playwright's
+        # in-page selector wait (fallback for pages where the latter misbehaves)
+        self.poll_response = poll_response
         self.playwright: Optional[Playwright] = None
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
         self._cookies: Optional[Dict[str, str]] = None
         self._is_headless: bool = headless
+        # Normalized name of the model last selected on self.page; cleared on navigation
+        self._current_model_cache: Optional[str] = None
+        # Chat input of self.page, reused across enter/send calls
+        self._chat_input_handle: Optional[Any] = None
+        # Model selector text last read on self.page; cleared whenever the
+        # model menu is used or the page navigates
+        self._model_text_cache: Optional[str] = None
+        self._owns_context: bool = True
+        # True when self.context is the wrapper-managed profile from an earlier run
+        self._uses_default_profile: bool = False
+        # Playwright borrowed from the pool for a persistent profile
+        self._holds_playwright: bool = False
+        # (emitter, event, handler) registered by start(debug_network=True)
+        self._network_listeners: List[Any] = []
         
         # Set logging level based on debug mode
         if not debug_mode:
             logger.setLevel(logging.WARNING)
 
-    def set_cookies(self, cookies: Dict[str, str]) -> None:
-        """Store cookies to be injected before navigation"""
-        self._cookies = cookies
-
-    def start(self, debug_network: bool = False) -> None:
-        """Start browser and initialize context"""
-        if not PLAYWRIGHT_AVAILABLE:
-            raise ImportError("Playwright is not installed")
+    @classmethod
+    def shutdown(cls) -> None:
+        """Close the calling thread's shared browsers (the main thread's also close at process exit)"""
+        cls._browser_pool.close()
 
-        logger.debug("🚀 Starting browser...")
-        
-        # Use actual Chrome browser (not Chromium) with MCP browser extension flags
-        self.playwright = sync_playwright().start()
-
-        # Find Chrome executable path (Windows)
-        chrome_paths = []
-        if platform.system() == "Windows":
-            chrome_paths = [
-                r"C:\Program Files\Google\Chrome\Application\chrome.exe",
-                r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
-                os.path.expanduser(r"~\AppData\Local\Google\Chrome\Application\chrome.exe"),
-            ]
-        elif platform.system() == "Darwin":  # macOS
-            chrome_paths = [
-                "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
-            ]
-        else:  # Linux
-            chrome_paths = [
-                "/usr/bin/google-chrome",
-                "/usr/bin/google-chrome-stable",
-                "/usr/bin/chromium-browser",
-            ]
-        
-        chrome_executable = None
-        for path in chrome_paths:
-            if os.path.exists(path):
-                chrome_executable = path
-                logger.debug(f"Found Chrome at: {chrome_executable}")
-                break
-        
-        if not chrome_executable:
-            logger.warning("Chrome executable not found, falling back to Chromium")
-            chrome_executable = None
-
-        # Chrome launch options (exact flags from MCP browser extension)
-        launch_options: Dict[str, Any] = {
-            "headless": self.headless,
-            "args": [
-                "--disable-field-trial-config",
-                "--disable-background-networking",
-                "--disable-background-timer-throttling",
-                "--disable-backgrounding-occluded-windows",
-                "--disable-back-forward-cache",
-                "--disable-breakpad",
-                "--disable-client-side-phishing-detection",
-                "--disable-component-extensions-with-background-pages",
-                "--disable-component-update",
-                "--no-default-browser-check",
-                "--disable-default-apps",
-                "--disable-dev-shm-usage",
-                "--disable-features=AcceptCHFrame,AvoidUnnecessaryBeforeUnloadCheckSync,DestroyProfileOnBrowserClose,DialMediaRouteProvider,GlobalMediaControls,HttpsUpgrades,LensOverlay,MediaRouter,PaintHolding,ThirdPartyStoragePartitioning,Translate,AutoDeElevate,RenderDocument,OptimizationHints,AutomationControlled",
-                "--enable-features=CDPScreenshotNewSurface",
-                "--allow-pre-commit-input",
-                "--disable-hang-monitor",
-                "--disable-ipc-flooding-protection",
-                "--disable-popup-blocking",
-                "--disable-prompt-on-repost",
-                "--disable-renderer-backgrounding",
-                "--force-color-profile=srgb",
-                "--metrics-recording-only",
-                "--no-first-run",
-                "--password-store=basic",
-                "--use-mock-keychain",
-                "--no-service-autorun",
-                "--export-tagged-pdf",
-                "--disable-search-engine-choice-screen",
-                "--unsafely-disable-devtools-self-xss-warnings",
-                "--edge-skip-compat-layer-relaunch",
-                "--disable-infobars",
-                "--disable-search-engine-choice-screen",
-                "--disable-sync",
-            ],
-        }
-        
-        # Add headless-specific flags for better compatibility
-        if self.headless:
-            launch_options["args"].extend([
-                "--disable-gpu",  # GPU not needed in headless
-                "--disable-software-rasterizer",  # Software rasterizer not needed
-                "--no-sandbox",  # Required for some headless environments
-                "--disable-setuid-sandbox",  # Required for some headless environments
-            ])
-
-        # Use actual Chrome executable if found
-        if chrome_executable:
-            launch_options["executable_path"] = chrome_executable
-            logger.debug(f"Using Chrome executable: {chrome_executable}")
+    def _launch_options(self) -> Dict[str, Any]:
+        """Options for chromium.launch() / launch_persistent_context()"""
+        return build_launch_options(self.headless)
 
-        # Note: user_data_dir can cause issues in headless mode on some systems
-        # Only use it if not in headless mode, or if explicitly needed
-        if self.user_data_dir:
-            if self.headless:
-                logger.debug("⚠ Using user_data_dir in headless mode - may cause issues on some systems")
-            launch_options["user_data_dir"] = self.user_data_dir
+    def _acquire_launched_browser(self) -> None:
+        """Borrow a locally launched Chrome from the browser pool"""
+        launch_options = self._launch_options()
 
-        # Launch Chrome (actual Chrome, not Chromium)
-        logger.debug(f"Launching Chrome in {'headless' if self.headless else 'headed'} mode")
+        # Borrow Chrome (actual Chrome, not Chromium) from the pool; it is only
+        # launched when no browser with these options is running yet
+        logger.debug(f"Acquiring Chrome in {'headless' if self.headless else 'headed'} mode")
         try:
-            self.browser = self.playwright.chromium.launch(**launch_options)
+            self.playwright, self.browser = self._browser_pool.acquire(launch_options)
         except Exception as e:
             if self.headless:
                 logger.error(f"Failed to launch Chrome in headless mode: {e}")
@@ -191,76 +312,109 @@ class GrokWebDriver:
                 logger.debug("Try running without --headless first to ensure Chrome works")
             raise
 
-        # Create context
-        context_options: Dict[str, Any] = {
-            "viewport": {"width": 1024, "height": 720},
-            "ignore_https_errors": False,
-            "java_script_enabled": True,
-            "locale": "en-US",
-            "timezone_id": "America/New_York",
-            "color_scheme": "light",
-        }
-
-        # Enhanced stealth mode
-        if self.stealth_mode:
-            context_options["extra_http_headers"] = {
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Accept-Encoding": "gzip, deflate, br",
-                "DNT": "1",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-            }
-            # Use Chrome user agent (like MCP browser extension)
-            context_options["user_agent"] = (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36"
+    def _launch_persistent_context(self, user_data_dir: str, context_options: Dict[str, Any]) -> bool:
+        """
+        Launch Chrome on a profile directory so Cloudflare clearance and other
+        site state survive between sessions. A profile can only be open in one
+        Chrome, so this browser is not pooled; closing the context closes it.
+        
+        Returns:
+            True if the context was created
+        """
+        # Note: user_data_dir can cause issues in headless mode on some systems
+        if self.headless:
+            logger.debug("⚠ Using user_data_dir in headless mode - may cause issues on some systems")
+        try:
+            if self.user_data_dir:
+                os.makedirs(user_data_dir, exist_ok=True)
+            else:
+                # Private to this user, also when the directory already existed
+                os.makedirs(user_data_dir, mode=0o700, exist_ok=True)
+                os.chmod(user_data_dir, 0o700)
+            self.playwright = self._browser_pool.get_playwright()
+            self._holds_playwright = True
+            self.context = self.playwright.chromium.launch_persistent_context(
+                user_data_dir, **self._launch_options(), **context_options
             )
+        except Exception as e:
+            self._release_playwright()
+            if self.user_data_dir:
+                raise
+            # The shared default profile is probably open in another driver
+            logger.warning(f"Could not open cached profile {user_data_dir}: {e}; using a fresh context")
+            return False
+        self._owns_context = True
+        self._uses_default_profile = not self.user_data_dir
+        logger.debug(f"Using persistent profile: {user_data_dir}")
+        return True
 
-        if not self.browser:
-            raise Exception("Browser not initialized")
+    def _release_playwright(self) -> None:
+        """Hand back the Playwright borrowed for a persistent profile, if any"""
+        if self._holds_playwright:
+            self._holds_playwright = False
+            self._browser_pool.release_playwright()
+
+    def set_cookies(self, cookies: Dict[str, str]) -> None:
+        """Store cookies to be injected before navigation"""
+        self._cookies = cookies
+
+    def start(self, debug_network: bool = False) -> None:
+        """Start browser and initialize context"""
+        if not PLAYWRIGHT_AVAILABLE:
+            raise ImportError("Playwright is not installed")
+
+        logger.debug("🚀 Starting browser...")
         
-        self.context = self.browser.new_context(**context_options)  # type: ignore
+        # Context options (also applied to a persistent profile)
+        context_options: Dict[str, Any] = dict(BASE_CONTEXT_OPTIONS)
 
-        # Inject stealth JavaScript
+        # Enhanced stealth mode
         if self.stealth_mode:
-            self.context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', {
-                    get: () => undefined
-                });
-                
-                // Chrome-specific properties (already present in Chrome, but ensure they're correct)
-                if (!window.chrome) {
-                    window.chrome = { runtime: {} };
-                }
-                
-                // Ensure Chrome-specific navigator properties
-                if (!navigator.plugins) {
-                    Object.defineProperty(navigator, 'plugins', {
-                        get: () => [1, 2, 3, 4, 5]
-                    });
-                }
-                
-                Object.defineProperty(document, 'hidden', {
-                    get: () => false,
-                    configurable: true
-                });
-                
-                Object.defineProperty(document, 'visibilityState', {
-                    get: () => 'visible',
-                    configurable: true
-                });
-            """)
+            context_options["extra_http_headers"] = dict(STEALTH_HEADERS)
+            # Use Chrome user agent (like MCP browser extension)
+            context_options["user_agent"] = STEALTH_USER_AGENT
 
-        # Enable network debugging if requested
-        if debug_network:
-            def log_request(request: Any) -> None:
-                logger.debug(f"→ {request.method} {request.url}")
+        self.browser = None
+        self.context = None
+        self._uses_default_profile = False
+        connected_over_cdp = False
+        if self.cdp_endpoint:
+            try:
+                self.playwright, self.browser = self._browser_pool.acquire_cdp(self.cdp_endpoint)
+                connected_over_cdp = True
+                logger.debug(f"Connected to Chrome over CDP: {self.cdp_endpoint}")
+            except Exception as e:
+                logger.warning(f"Could not connect to CDP endpoint {self.cdp_endpoint}: {e}; launching Chrome instead")
+        profile_dir = self.user_data_dir or (_DEFAULT_PROFILE_DIR if self.reuse_profile else None)
+        if not self.browser and profile_dir:
+            self._launch_persistent_context(profile_dir, context_options)
+        if not self.browser and not self.context:
+            self._acquire_launched_browser()
 
-            def log_response(response: Any) -> None:
-                logger.debug(f"← {response.status} {response.url}")
+        if not self.context:
+            if not self.browser:
+                raise Exception("Browser not initialized")
+            
+            # A CDP-attached Chrome already has a default context (the user's
+            # profile); reuse it rather than opening an empty one
+            existing_contexts = self.browser.contexts if connected_over_cdp else []
+            if existing_contexts:
+                self.context = existing_contexts[0]
+                self._owns_context = False
+            else:
+                self.context = self.browser.new_context(**context_options)  # type: ignore
+                self._owns_context = True
 
-            self.context.on("request", log_request)
-            self.context.on("response", log_response)
+        # Stealth script and DOM helpers go on our own context. A reused CDP
+        # context belongs to the user's browser and init scripts cannot be
+        # removed again, so there they are added to the driver's pages only.
+        if self._owns_context:
+            self._install_init_scripts(self.context)
+
+        # Skip heavy static assets; only our own context is routed, never a
+        # reused CDP context that belongs to the user's browser
+        if self.block_resources and self._owns_context:
+            self.context.route(BLOCKED_RESOURCE_URL_RE, _abort_blocked_resource)
 
         # CRITICAL: Inject cookies BEFORE creating pages (like Perplexity wrapper)
         # This ensures cookies are available when we navigate
@@ -268,70 +422,81 @@ class GrokWebDriver:
             logger.debug("🍪 Injecting cookies into context (before page creation)...")
             self._inject_cookies()
 
-        # Create main page AFTER cookies are injected
-        self.page = self.context.new_page()
+        # Create main page AFTER cookies are injected (a persistent context
+        # opens with a blank tab already; use that one)
+        self.page = self.context.pages[0] if self.context.pages and not self.browser else self.context.new_page()
+        if not self._owns_context:
+            self._install_init_scripts(self.page)
+        
+        # Enable network debugging if requested
+        # (only when DEBUG output is on; the handlers fire for every request)
+        if debug_network and logger.isEnabledFor(logging.DEBUG):
+            def log_request(request: Any) -> None:
+                if not logger.isEnabledFor(logging.DEBUG):
+                    return
+                logger.debug(f"→ {request.method} {request.url}")
+
+            def log_response(response: Any) -> None:
+                if not logger.isEnabledFor(logging.DEBUG):
+                    return
+                logger.debug(f"← {response.status} {response.url}")
+
+            # Only the driver's page is watched on a reused CDP context
+            emitter = self.context if self._owns_context else self.page
+            for event, handler in (("request", log_request), ("response", log_response)):
+                emitter.on(event, handler)
+                self._network_listeners.append((emitter, event, handler))
+        
+        self._current_model_cache = None
+        self._chat_input_handle = None
+        self._model_text_cache = None
         self.page.set_viewport_size({"width": 1024, "height": 720})
 
+    def _install_init_scripts(self, target: Any) -> None:
+        """Add the stealth script (if enabled) and the DOM helpers to a context or page"""
+        if self.stealth_mode:
+            target.add_init_script(STEALTH_INIT_SCRIPT)
+        # Install the DOM helpers once per document instead of shipping them per call
+        register_automation_helpers(target)
+
+    def new_page_session(self) -> Page:
+        """
+        Open another tab in this driver's context.
+        
+        The tab shares cookies, cache and the JS helpers with self.page; pass it
+        to navigate_to_grok(page) / is_logged_in(page) to run a separate query.
+        Playwright's sync API is not thread-safe, so drive all pages from the
+        thread that called start().
+        
+        Returns:
+            New page (close it with page.close() when done)
+        """
+        if not self.context:
+            raise Exception("Browser not started")
+        page = self.context.new_page()
+        if not self._owns_context:
+            self._install_init_scripts(page)
+        page.set_viewport_size(BASE_CONTEXT_OPTIONS["viewport"])
+        return page
+
     def _inject_cookies(self) -> None:
         """Inject cookies into browser context BEFORE navigation (like Perplexity wrapper)"""
         if not self.context or not self._cookies:
             return
 
-        cookies_list = []
-        for name, value in self._cookies.items():
-            if not name or not isinstance(value, str) or len(str(value)) > 4000:
-                continue
-            
-            try:
-                # Determine which domain this cookie belongs to
-                # Grok uses both grok.com and x.ai (for authentication)
-                cookie_urls = []
-                
-                # Check if it's an x.ai cookie (SSO, authentication)
-                if any(keyword in name.lower() for keyword in ['sso', 'x-userid', 'x-anonuserid', 'x-challenge', 'x-signature']):
-                    cookie_urls.append("https://x.ai")
-                    cookie_urls.append("https://accounts.x.ai")
-                
-                # Always add grok.com
-                cookie_urls.append("https://grok.com")
-                
-                # Use URL-based cookie injection (more reliable than domain/path)
-                # This matches how Perplexity wrapper does it
-                for url in cookie_urls:
-                    cookie_data = {
-                        "name": str(name),
-                        "value": str(value),
-                        "url": url,  # URL-based injection
-                        "secure": True,
-                        "sameSite": "Lax",
-                    }
-                    
-                    # Handle __Host- prefix (requires path=/ and no domain)
-                    if name.startswith("__Host-"):
-                        cookie_data["path"] = "/"
-                        # Don't set domain for __Host- cookies
-                    
-                    cookies_list.append(cookie_data)
-            except Exception as e:
-                logger.debug(f"Failed to format cookie {name}: {e}")
-                continue
-        
+        cookies_list = build_cookie_list(self._cookies)
         if cookies_list:
             try:
+                if self._uses_default_profile:
+                    # The shared profile may still hold another account's
+                    # session; start from exactly the cookies given
+                    self.context.clear_cookies()
                 self.context.add_cookies(cookies_list)  # type: ignore
                 logger.debug(f"✓ Injected {len(cookies_list)} cookies into context (before navigation)")
             except Exception as e:
-                logger.warning(f"Failed to inject cookies: {e}, trying individual injection")
-                # Fallback: inject individually
-                injected = 0
-                for cookie in cookies_list:
-                    try:
-                        self.context.add_cookies([cookie])  # type: ignore
-                        injected += 1
-                    except Exception:
-                        logger.debug(f"Failed to inject cookie: {cookie.get('name')}")
-                if injected > 0:
-                    logger.debug(f"✓ Injected {injected}/{len(cookies_list)} cookies individually")
+                # One batched call only; a bad cookie is reported rather than
+                # retried cookie by cookie
+                logger.warning(f"Failed to inject cookies: {e}")
 
     def navigate_to_grok(self, page: Optional[Page] = None) -> None:
         """Navigate to Grok homepage"""
@@ -342,11 +507,16 @@ class GrokWebDriver:
         # Cookies are already injected in start() method - no need to check again
 
         logger.debug("🌐 Navigating to https://grok.com...")
+        if target_page is self.page:
+            # A fresh page starts on the default model and a new chat input
+            self._current_model_cache = None
+            self._chat_input_handle = None
+            self._model_text_cache = None
         nav_start = time.time()
         try:
             target_page.goto(
                 "https://grok.com",
-                wait_until="domcontentloaded",  # Start with DOM ready
+                wait_until="commit",  # Return on the response; the checks below tolerate a loading DOM
                 timeout=5000  # OPTIMIZED: Reduced from 15000ms (15s) to 5000ms (5s)
             )
             nav_time = time.time() - nav_start
@@ -356,42 +526,71 @@ class GrokWebDriver:
             # No need to wait for rendering or React/JS - they're already loaded
             
             # Close any popups/modals that appeared
-            popup_result = target_page.evaluate(close_popups_js())
-            if popup_result and popup_result.get('closed'):
-                methods = popup_result.get('methods', [])
+            popup_result = self._evaluate_js_api_during_load(target_page, 'closePopups') or {}
+            if popup_result.get('closed'):
+                methods = popup_result.get('methods', ())
                 logger.info(f"✓ Closed popup using: {', '.join(methods)}")
                 # No wait needed - popup close is instant
             
             # Quick single check if input is ready (no loop)
-            verification = target_page.evaluate(verify_grok_homepage_js())
-            if verification and verification.get('mainInputVisible'):
+            verification = self._evaluate_js_api_during_load(target_page, 'verifyHomepage') or {}
+            if verification.get('mainInputVisible'):
                 logger.debug("✓ Homepage input ready")
             else:
                 logger.debug("⚠ Input check skipped, continuing...")
             
-            # Verify cookies are present in the page
-            try:
-                page_cookies = target_page.context.cookies()
-                logger.debug(f"Page has {len(page_cookies)} cookies after navigation")
+            # Verify cookies are present in the page (diagnostics only; a missing
+            # auth cookie shows up on the next real request anyway)
+            if self.debug_mode and logger.isEnabledFor(logging.DEBUG):
+                try:
+                    page_cookies = target_page.context.cookies()
+                    logger.debug(f"Page has {len(page_cookies)} cookies after navigation")
                 
-                # Check for key authentication cookies
-                auth_cookies = ['sso', 'sso-rw', 'x-userid', 'x-anonuserid', 'x-challenge', 'x-signature']
-                found_auth = [c.get('name') for c in page_cookies if c.get('name') in auth_cookies]
-                if found_auth:
-                    logger.debug(f"✓ Found auth cookies: {found_auth}")
-                else:
-                    logger.debug("⚠ No authentication cookies found after navigation - cookies may be expired")
-                    logger.debug("💡 Try extracting fresh cookies: grok extract-cookies --browser firefox")
+                    # Check for key authentication cookies
+                    auth_cookies = ['sso', 'sso-rw', 'x-userid', 'x-anonuserid', 'x-challenge', 'x-signature']
+                    found_auth = [c.get('name') for c in page_cookies if c.get('name') in auth_cookies]
+                    if found_auth:
+                        logger.debug(f"✓ Found auth cookies: {found_auth}")
+                    else:
+                        logger.debug("⚠ No authentication cookies found after navigation - cookies may be expired")
+                        logger.debug("💡 Try extracting fresh cookies: grok extract-cookies --browser firefox")
                 
-                # Log all cookie names for debugging
-                cookie_names = [c.get('name') for c in page_cookies]
-                logger.debug(f"All cookies: {cookie_names[:10]}...")  # First 10
-            except Exception as e:
-                logger.debug(f"Could not verify cookies: {e}")
+                    # Log all cookie names for debugging
+                    cookie_names = [c.get('name') for c in page_cookies]
+                    logger.debug(f"All cookies: {cookie_names[:10]}...")  # First 10
+                except Exception as e:
+                    logger.debug(f"Could not verify cookies: {e}")
         except Exception as e:
             logger.error(f"✗ Failed to navigate to grok.com: {e}")
             raise
 
+    def _wait_for_dom_predicate(self, js_predicate: str, timeout_ms: int = 800, arg: Any = None) -> bool:
+        """
+        Wait in the page until a JS predicate holds, instead of a fixed sleep.
+        
+        Args:
+            js_predicate: Source of a JS function (optionally taking arg)
+            timeout_ms: Give up after this many milliseconds
+            arg: JSON-serializable argument passed to the predicate
+        
+        Returns:
+            True if the predicate became truthy before the timeout
+        """
+        if not self.page:
+            return False
+        return bool(self.page.evaluate(wait_for_dom_predicate_js(js_predicate), [timeout_ms, arg]))
+
+    @staticmethod
+    def _evaluate_js_api_during_load(page: Page, name: str) -> Any:
+        """Call a JS helper right after goto(); retries once if a redirect replaced the document"""
+        try:
+            return evaluate_js_api(page, name)
+        except Exception as e:
+            if "Execution context was destroyed" not in str(e):
+                raise
+            logger.debug(f"Document replaced during {name}, retrying")
+            return evaluate_js_api(page, name)
+
     def is_logged_in(self, page: Optional[Page] = None) -> bool:
         """Check if user is logged in"""
         target_page = page or self.page
@@ -414,25 +613,14 @@ class GrokWebDriver:
             
             # Wait for chat input to appear - this is the most reliable indicator
             # Cloudflare challenges and React hydration must complete before input appears
-            # OPTIMIZED: Use single wait_for_selector with visible state (faster than separate attached + visible)
+            # The probe runs in the page, so the worst case is one 3s timeout
             chat_input_found = False
-            selectors_to_try = [
-                'textarea[aria-label*="Ask Grok"]',
-                'textarea[aria-label*="Ask"]',
-                '[contenteditable="true"]',  # Most common, check first
-                'textarea'
-            ]
-            
-            # Try to find chat input with optimized timeouts
-            for selector in selectors_to_try:
-                try:
-                    # Wait for element to be visible directly (faster than attached then visible)
-                    target_page.wait_for_selector(selector, state="visible", timeout=3000)  # Reduced from 5s+3s
-                    chat_input_found = True
-                    logger.debug(f"✓ Found chat input with selector: {selector}")
-                    break
-                except Exception:
-                    continue
+            try:
+                target_page.wait_for_function(_CHAT_INPUT_VISIBLE_JS, timeout=3000)
+                chat_input_found = True
+                logger.debug("✓ Found chat input")
+            except Exception:
+                pass
             
             if not chat_input_found:
                 logger.debug("⚠ Chat input not found after waiting - checking URL and other indicators")
@@ -451,140 +639,11 @@ class GrokWebDriver:
                 logger.debug(f"Not on grok.com, URL: {current_url}")
                 return False
             
-            # If chat input was found, we're likely logged in - proceed with verification
             if chat_input_found:
                 logger.debug("✓ Chat input found - likely logged in, verifying...")
-                # Skip redundant JavaScript check if we already found the input
-                # Just verify it's interactive
-                try:
-                    # Quick verification that input is interactive
-                    is_interactive = target_page.evaluate("""
-                        () => {
-                            const selectors = [
-                                'textarea[aria-label*="Ask Grok"]',
-                                'textarea[aria-label*="Ask"]',
-                                'textarea',
-                                '[contenteditable="true"]'
-                            ];
-                            for (const selector of selectors) {
-                                const input = document.querySelector(selector);
-                                if (input) {
-                                    const rect = input.getBoundingClientRect();
-                                    const isVisible = rect.width > 0 && rect.height > 0;
-                                    const isEnabled = !input.disabled && !input.readOnly;
-                                    if (isVisible && isEnabled) {
-                                        return { loggedIn: true, reason: 'has_chat_input_can_interact' };
-                                    }
-                                }
-                            }
-                            return { loggedIn: false, reason: 'chat_input_not_interactive' };
-                        }
-                    """)
-                    if is_interactive and is_interactive.get('loggedIn'):
-                        logger.debug(f"Login check result: {is_interactive.get('reason')}")
-                        check_time = time.time() - check_start
-                        logger.debug(f"✓ Logged in (check took {check_time:.2f}s)")
-                        return True
-                except Exception as e:
-                    logger.debug(f"Quick verification failed: {e}, falling back to full check")
             
-            # Use JavaScript for more reliable detection with better debugging (only if input not found or quick check failed)
-            # Skip this if we already verified login status above
-            if not chat_input_found:
-                login_status = target_page.evaluate("""
-                () => {
-                    // Check URL
-                    if (window.location.href.includes('sign-in') || 
-                        window.location.href.includes('sign-up') || 
-                        window.location.href.includes('accounts.x.ai')) {
-                        return { loggedIn: false, reason: 'redirected_to_login' };
-                    }
-                    
-                    // Check for chat input - try multiple selectors
-                    const selectors = [
-                        'textarea[aria-label*="Ask Grok"]',
-                        'textarea[aria-label*="Ask"]',
-                        'textarea',
-                        '[contenteditable="true"]',
-                        'input[type="text"]'
-                    ];
-                    
-                    let chatInput = null;
-                    let foundSelector = null;
-                    for (const selector of selectors) {
-                        chatInput = document.querySelector(selector);
-                        if (chatInput) {
-                            foundSelector = selector;
-                            break;
-                        }
-                    }
-                    
-                    if (!chatInput) {
-                        return { loggedIn: false, reason: 'no_chat_input_found' };
-                    }
-                    
-                    // Check if input is visible and enabled
-                    const rect = chatInput.getBoundingClientRect();
-                    const isVisible = rect.width > 0 && rect.height > 0;
-                    const isEnabled = !chatInput.disabled && !chatInput.readOnly;
-                    
-                    if (!isVisible) {
-                        return { loggedIn: false, reason: 'chat_input_not_visible' };
-                    }
-                    
-                    if (!isEnabled) {
-                        return { loggedIn: false, reason: 'chat_input_disabled' };
-                    }
-                    
-                    // Check for visible login buttons in header/nav (not footer)
-                    // Be more strict - only count as login button if it's clearly a login button
-                    const loginLinks = Array.from(document.querySelectorAll('a[href*="sign-in"], a[href*="login"], button'));
-                    const visibleLogin = loginLinks.some(link => {
-                        const linkRect = link.getBoundingClientRect();
-                        const linkText = (link.textContent || '').toLowerCase().trim();
-                        const href = (link.href || '').toLowerCase();
-                        
-                        // Must be in top portion of page (header area)
-                        if (linkRect.top >= 300 || linkRect.height === 0) {
-                            return false;
-                        }
-                        
-                        // Must have clear login/sign-in text or href
-                        const isLoginButton = (
-                            (linkText === 'sign in' || linkText === 'login' || linkText === 'sign up') ||
-                            (href.includes('sign-in') || href.includes('/login'))
-                        );
-                        
-                        return isLoginButton;
-                    });
-                    
-                    // Also check if we can actually interact with the chat input
-                    // Try to focus it - if we can, we're likely logged in
-                    let canInteract = false;
-                    try {
-                        chatInput.focus();
-                        canInteract = document.activeElement === chatInput;
-                    } catch (e) {
-                        // Can't focus, might not be logged in
-                    }
-                    
-                    // If we have chat input and can interact with it, we're logged in
-                    // Even if there are login buttons visible, if we can interact with chat, we're logged in
-                    // (Some pages show login buttons even when logged in)
-                    // Also check if the input is actually usable (not just present)
-                    const isUsable = isVisible && isEnabled && canInteract;
-                    const loggedIn = isUsable || (!visibleLogin && chatInput && isVisible && isEnabled);
-                    return { 
-                        loggedIn: loggedIn, 
-                        reason: loggedIn ? 'has_chat_input_can_interact' : (visibleLogin ? 'has_login_buttons' : (isVisible ? 'input_not_enabled' : 'input_not_visible')),
-                        foundSelector: foundSelector,
-                        hasLoginButtons: visibleLogin,
-                        canInteract: canInteract,
-                        isVisible: isVisible,
-                        isEnabled: isEnabled
-                    };
-                }
-            """)
+            # URL, input and login-button checks in a single round trip
+            login_status = target_page.evaluate(_LOGIN_CHECK_JS)
             
             # Extract login status from result
             if isinstance(login_status, dict):
@@ -616,20 +675,44 @@ class GrokWebDriver:
 
         logger.debug(f"⏳ Waiting for login (timeout: {timeout}s)...")
         start_time = time.time()
+        deadline = time.monotonic() + timeout
         check_count = 0
         
-        while time.time() - start_time < timeout:
+        # Event-driven wait for the sign-in -> grok.com redirect; returns at once
+        # if the page is already on grok.com. Kept short: login can finish
+        # in-page (or on accounts.x.ai) without the URL ever matching, and the
+        # loop below also wakes up on every navigation.
+        try:
+            self.page.wait_for_url(
+                lambda url: 'grok.com' in url and 'sign-in' not in url and 'sign-up' not in url,
+                timeout=min(timeout, _LOGIN_REDIRECT_WAIT) * 1000
+            )
+        except Exception:
+            pass
+        
+        # Confirm, then re-check on each navigation or after a backoff delay
+        # (login can also happen in-page without a navigation); always check
+        # at least once
+        delay = 0.25
+        while check_count == 0 or time.monotonic() < deadline:
             check_count += 1
             elapsed = time.time() - start_time
             
             if self.is_logged_in():
-                logger.debug(f"✓ Login detected after {elapsed:.1f}s ({check_count} checks)")
+                logger.debug("✓ Login detected after %.1fs (%d checks)", elapsed, check_count)
                 return True
             
-            # Reduced from 2s to 1s for faster detection
             if check_count % 5 == 0:  # Log every 5 checks
-                logger.debug(f"⏳ Still waiting... ({elapsed:.1f}s elapsed, {check_count} checks)")
-            time.sleep(0.5)  # OPTIMIZED: Reduced from 1s to 0.5s
+                logger.debug("⏳ Still waiting... (%.1fs elapsed, %d checks)", elapsed, check_count)
+            # wait_for_event keeps Playwright's event loop running, unlike
+            # time.sleep or a threading.Event, so navigations end the wait early
+            wait = min(delay, deadline - time.monotonic())
+            if wait > 0:
+                try:
+                    self.page.wait_for_event("framenavigated", timeout=wait * 1000)
+                except Exception:
+                    pass  # Timed out without a navigation; check again anyway
+            delay = min(2.0, delay * 1.5)
         
         elapsed = time.time() - start_time
         logger.warning(f"✗ Login timeout after {elapsed:.1f}s ({check_count} checks)")
@@ -674,10 +757,10 @@ class GrokWebDriver:
         
         try:
             logger.debug("Closing popups/advertisements...")
-            popup_result = self.page.evaluate(close_popups_js())
+            popup_result = evaluate_js_api(self.page, 'closePopups') or {}
             
-            if popup_result and popup_result.get('closed'):
-                methods = popup_result.get('methods', [])
+            if popup_result.get('closed'):
+                methods = popup_result.get('methods', ())
                 logger.info(f"✓ Closed popup using: {', '.join(methods)}")
                 return True
             else:
@@ -702,37 +785,16 @@ class GrokWebDriver:
             logger.info("🔍 [DeepSearch] Enabling DeepSearch...")
             
             # Find and click the DeepSearch button using JavaScript
-            click_result = self.page.evaluate("""
-                            () => {
-                    const buttons = Array.from(document.querySelectorAll('button[data-slot="button"]'));
-                                for (const btn of buttons) {
-                                    const text = (btn.innerText || btn.textContent || '').trim();
-                                    if (text === 'DeepSearch' || text.toLowerCase() === 'deepsearch') {
-                                        const rect = btn.getBoundingClientRect();
-                            if (rect.width > 0 && rect.height > 0) {
-                                    btn.scrollIntoView({ behavior: 'instant', block: 'center' });
-                                    btn.click();
-                                return { clicked: true };
-                            }
-                        }
-                    }
-                    return { clicked: false };
-                }
-            """)
+            click_result = evaluate_js_api(self.page, 'clickDeepSearch') or {}
             
-            if not (click_result and click_result.get('clicked')):
+            if not click_result.get('clicked'):
                 logger.warning("[DeepSearch] ✗ Could not find or click DeepSearch button")
                 return False
             
             logger.info("[DeepSearch] ✓ Clicked button")
             
-            # Wait briefly for UI to update
-            time.sleep(0.3)  # Trimmed from 0.5s
-            
-            # Verify DeepSearch is enabled
-            verification_result = self.page.evaluate(verify_deepsearch_enabled_js())
-            
-            if verification_result and verification_result.get('enabled'):
+            # Verify DeepSearch is enabled, waiting for the UI to update
+            if self._wait_for_dom_predicate(DEEPSEARCH_ENABLED_PREDICATE_JS):
                 logger.info("[DeepSearch] ✓ DeepSearch enabled and verified")
                 return True
             else:
@@ -742,7 +804,6 @@ class GrokWebDriver:
         except Exception as e:
             logger.error(f"[DeepSearch] ✗ Error enabling DeepSearch: {e}")
             if self.debug_mode:
-                import traceback
                 logger.debug(f"[DeepSearch] Traceback: {traceback.format_exc()}")
             return False
 
@@ -762,34 +823,27 @@ class GrokWebDriver:
         model_lower = model.lower().strip()
         logger.debug(f"set_model called with: '{model}' (normalized: '{model_lower}')")
         
+        # Already selected on this page: skip the menu interaction
+        if self._current_model_cache == model_lower:
+            logger.debug(f"Model already set to {model_lower}")
+            return True
+        
+        # The menu interaction below changes the selector text
+        self._model_text_cache = None
+        
         # Handle Grok 4.1 models using the new select_grok_model method
-        if model_lower in ['grok-4.1', 'grok-4-1']:
-            logger.info(f"🔧 Detected Grok 4.1 model, using select_grok_model()")
-            result = self.select_grok_model("Grok 4.1")
+        grok_model_name = GROK_MODEL_NAMES.get(model_lower)
+        if grok_model_name:
+            logger.info(f"🔧 Detected {grok_model_name} model, using select_grok_model()")
+            result = self.select_grok_model(grok_model_name)
             if result:
-                logger.info(f"✓ Grok 4.1 selected successfully")
+                self._current_model_cache = model_lower
+                logger.info(f"✓ {grok_model_name} selected successfully")
             else:
-                logger.warning(f"✗ Failed to select Grok 4.1")
+                logger.warning(f"✗ Failed to select {grok_model_name}")
             return result
-        elif model_lower in ['grok-4.1-think', 'grok-4-1-think', 'grok-4.1-thinking', 'grok-4-1-thinking']:
-            logger.info(f"🔧 Detected Grok 4.1 Thinking model, using select_grok_model()")
-            result = self.select_grok_model("Grok 4.1 Thinking")
-            if result:
-                logger.info(f"✓ Grok 4.1 Thinking selected successfully")
-            else:
-                logger.warning(f"✗ Failed to select Grok 4.1 Thinking")
-            return result
-        
-        # Map model names to actual menu item text (from HTML structure)
-        model_text_map = {
-            'auto': 'Auto Chooses Fast or Expert',
-            'fast': 'Fast Quick responses',
-            'expert': 'Expert Thinks hard',
-            'grok-4-fast': 'Grok 4 Fast Beta',
-            'heavy': 'Heavy Team of experts'
-        }
         
-        target_text = model_text_map.get(model_lower)
+        target_text = MODEL_TEXT_MAP.get(model_lower)
         if not target_text:
             logger.warning(f"Unknown model: {model}")
             return False
@@ -798,102 +852,20 @@ class GrokWebDriver:
             model_set_start = time.time()
             logger.debug(f"🔧 Setting model to: {model}...")
             
-            # Click model selector button using JavaScript
-            button_click_start = time.time()
-            result = self.page.evaluate("""
-                () => {
-                    const buttons = document.querySelectorAll('#model-select-trigger, button[aria-label="Model select"]');
-                    if (buttons.length > 0) {
-                        const button = buttons[0];
-                        button.focus();
-                        button.click();
-                        return { clicked: true };
-                    }
-                    return { clicked: false };
-                }
-            """)
+            # Open the selector, wait for the menu and click the item in one
+            # round trip (the wait runs in the page on a MutationObserver)
+            click_start = time.time()
+            result = evaluate_js_api(self.page, 'selectModelItem', target_text)
             
             if not result.get('clicked'):
                 logger.warning("Could not find/click model selector button")
                 return False
             
-            logger.debug(f"Button click took {time.time() - button_click_start:.2f}s")
-            
-            # Step 2: Wait for menu to appear - check in document body and any portals
-            menu_wait_start = time.time()
-            menu_visible = False
-            for i in range(8):  # Reduced from 15 to 8 (max 0.8s instead of 3s)
-                menu_visible = self.page.evaluate("""
-                    () => {
-                        // Check for menu in main document
-                        let menu = document.querySelector('[role="menu"]');
-                        if (menu) {
-                            const rect = menu.getBoundingClientRect();
-                            const style = window.getComputedStyle(menu);
-                            if (rect.width > 0 && rect.height > 0 && 
-                                menu.offsetParent !== null &&
-                                style.display !== 'none' &&
-                                style.visibility !== 'hidden') {
-                                return true;
-                            }
-                        }
-                        
-                        // Also check in any portals/overlays (Radix UI often uses portals)
-                        const portals = document.querySelectorAll('[data-radix-portal], [data-radix-menu-content]');
-                        for (const portal of portals) {
-                            const menuInPortal = portal.querySelector('[role="menu"]');
-                            if (menuInPortal) {
-                                const rect = menuInPortal.getBoundingClientRect();
-                                if (rect.width > 0 && rect.height > 0) {
-                                    return true;
-                                }
-                            }
-                        }
-                        
-                        return false;
-                    }
-                """)
-                if menu_visible:
-                    menu_wait_time = time.time() - menu_wait_start
-                    logger.debug(f"Menu appeared after {menu_wait_time:.2f}s")
-                    break
-                time.sleep(0.1)  # Reduced from 0.2s to 0.1s
-            
-            if not menu_visible:
+            if not result.get('menuVisible'):
                 logger.warning("Menu did not appear after clicking model selector")
                 return False
             
-            # Minimal wait for menu items to render
-            time.sleep(0.1)  # Reduced from 0.2s
-            
-            # Step 4: Find and click the target menu item using JavaScript (faster than Playwright)
-            click_start = time.time()
-            model_clicked = self.page.evaluate(f"""
-                () => {{
-                    // Find all menu items
-                    const items = Array.from(document.querySelectorAll('[role="menuitem"]'));
-                    
-                    // Look for the item with exact matching text
-                    let targetItem = null;
-                    for (const item of items) {{
-                        const text = (item.innerText || item.textContent || '').trim();
-                        // Match exact text only
-                        if (text === '{target_text}') {{
-                            targetItem = item;
-                            break;
-                        }}
-                    }}
-                    
-                    if (targetItem) {{
-                        targetItem.scrollIntoView({{ behavior: 'instant', block: 'center' }});
-                        targetItem.click();
-                        return true;
-                    }}
-                    return false;
-                }}
-            """)
-            
-            if not model_clicked:
+            if not result.get('itemClicked'):
                 logger.warning(f"Could not find/click model option: {target_text}")
                 return False
             
@@ -901,13 +873,14 @@ class GrokWebDriver:
             logger.debug(f"✓ Clicked model option: {target_text} (took {click_time:.2f}s)")
             model_set_time = time.time() - model_set_start
             logger.debug(f"Total model selection took {model_set_time:.2f}s")
+            self._current_model_cache = model_lower
             return True
                 
         except Exception as e:
             model_set_time = time.time() - model_set_start if 'model_set_start' in locals() else 0
             logger.warning(f"Error setting model: {e} (took {model_set_time:.2f}s)")
-            import traceback
-            logger.debug(traceback.format_exc())
+            if self.debug_mode:
+                logger.debug(traceback.format_exc())
             return False
 
     def select_grok_model(self, target_model_name: str = "Grok 4.1 Thinking") -> bool:
@@ -924,6 +897,9 @@ class GrokWebDriver:
             logger.warning("⚠ Cannot select model: page not available")
             return False
         
+        # Clicking through the menu changes the selector text
+        self._model_text_cache = None
+        
         try:
             logger.info(f"🔧 Selecting Grok model: {target_model_name}...")
             
@@ -935,6 +911,18 @@ class GrokWebDriver:
             
             # OPTIMIZED: Removed wait - DOM is already ready after wait_for_load_state
             
+            # Fast path: the whole menu -> submenu -> option sequence in one
+            # evaluate; fall back to the step-by-step locator flow below
+            fast_result = evaluate_js_api(self.page, 'selectGrokModel', target_model_name) or {}
+            if fast_result.get('selected'):
+                logger.info(f"✓ Clicked model option: {target_model_name}")
+                return True
+            step = fast_result.get('step')
+            logger.debug(f"In-page model selection stopped at '{step}', using locators")
+            if step != 'trigger':
+                # Close the half-open menu so the trigger click below opens it again
+                self.page.keyboard.press("Escape")
+            
             # 1. Open the Main Menu
             # There can be multiple elements with the same ID, so use .first to handle strict mode
             logger.debug("Looking for model selector button (#model-select-trigger)...")
@@ -955,27 +943,7 @@ class GrokWebDriver:
             except Exception:
                 # Button exists but is hidden - use JavaScript to click it
                 logger.debug("Button is hidden, using JavaScript click with visibility manipulation")
-                trigger_btn.evaluate("""
-                    (element) => {
-                        // Try to make element visible
-                        const originalStyle = element.style.cssText;
-                        element.style.display = 'block';
-                        element.style.visibility = 'visible';
-                        element.style.opacity = '1';
-                        
-                        // Scroll into view
-                        element.scrollIntoView({ behavior: 'instant', block: 'center' });
-                        
-                        // Click using multiple methods
-                        element.click();
-                        element.dispatchEvent(new MouseEvent('click', { bubbles: true, cancelable: true }));
-                        element.dispatchEvent(new PointerEvent('pointerdown', { bubbles: true, cancelable: true, pointerId: 1 }));
-                        element.dispatchEvent(new PointerEvent('pointerup', { bubbles: true, cancelable: true, pointerId: 1 }));
-                        
-                        // Restore original style
-                        element.style.cssText = originalStyle;
-                    }
-                """)
+                trigger_btn.evaluate(force_click_element_js())
             logger.debug("✓ Clicked main menu trigger")
             
             # OPTIMIZED: Removed wait - wait_for() below ensures menu is ready
@@ -994,63 +962,45 @@ class GrokWebDriver:
             if self.headless:
                 logger.debug("Headless mode: Using click instead of hover for Models menu")
                 models_menu_item.click()
-                # In headless mode, submenu may take longer to appear after click
-                time.sleep(0.3)  # Wait for submenu to appear after click
             else:
                 # In headed mode, hover works better for Radix UI submenus
                 models_menu_item.hover()
                 logger.debug("Hovered over 'Models' item")
-                # OPTIMIZED: Reduced wait - submenu appears quickly after hover
-                time.sleep(0.05)  # Minimal wait for submenu animation
             
             # 3. Select the Target Model from submenu
-            # Wait for submenu to appear
-            self.page.wait_for_selector('menu, [role="menu"]', state="attached", timeout=2000)
-            if self.headless:
-                time.sleep(0.2)
+            # Wait for submenu to appear (headless may take longer after click)
+            self._wait_for_dom_predicate(_SUBMENU_OPEN_PREDICATE_JS, timeout_ms=2000)
             
-            # Find submenu (second menu after main menu)
-            all_menus = self.page.locator('menu, [role="menu"]').all()
-            if len(all_menus) < 2:
+            # Find submenu (second menu after main menu) without enumerating all menus
+            submenu = self.page.locator('menu, [role="menu"]').nth(1)
+            try:
+                submenu.wait_for(state="attached", timeout=1000)
+            except Exception:
                 logger.error("Submenu not found")
                 return False
+            logger.debug("Found submenu")
             
-            submenu = all_menus[1]
-            logger.debug(f"Found submenu (menu {len(all_menus)} total)")
-            
-            # Select exact model from submenu
-            if target_model_name == "Grok 4.1":
-                # Find "Grok 4.1" that's NOT "Grok 4.1 Thinking"
-                all_submenu_items = submenu.get_by_role("menuitem").all()
-                for item in all_submenu_items:
-                    item_text = item.inner_text().lower()
-                    if "grok 4.1" in item_text and "thinking" not in item_text:
-                        target_option = item
-                        break
-                else:
-                    logger.error("Grok 4.1 option not found in submenu")
-                    return False
-            else:
-                # For "Grok 4.1 Thinking", use exact text match
-                target_option = submenu.get_by_role("menuitem").filter(
-                    has_text=target_model_name
-                ).first
+            # Select exact model from submenu, matched in the page in one call
+            # ("Grok 4.1" must not match "Grok 4.1 Thinking")
+            target_option = submenu.evaluate_handle(_FIND_SUBMENU_MODEL_ITEM_JS, target_model_name).as_element()
+            if not target_option:
+                logger.error(f"{target_model_name} option not found in submenu")
+                return False
             
             # Wait for the submenu animation to finish and element to be clickable - OPTIMIZED: Reduced from 1500ms to 1000ms
-            target_option.wait_for(state="visible", timeout=1000)
+            target_option.wait_for_element_state("visible", timeout=1000)
             
             target_option.click()
             logger.info(f"✓ Clicked model option: {target_model_name}")
             
-            # Wait for UI update
-            time.sleep(0.1)
+            # Wait for UI update (menu closes on selection)
+            self._wait_for_dom_predicate(_MENU_CLOSED_PREDICATE_JS, timeout_ms=300)
             
             return True
             
         except Exception as e:
             logger.error(f"Failed to select model: {e}")
             if self.debug_mode:
-                import traceback
                 logger.debug(f"Traceback: {traceback.format_exc()}")
             return False
     
@@ -1070,27 +1020,15 @@ class GrokWebDriver:
         try:
             model_lower = model.lower().strip()
             
-            # Get current model from UI
-            current_model = self.page.locator('#model-select-trigger').first.inner_text()
+            # Get current model from UI (plain evaluate: no locator auto-wait);
+            # the text only changes through the model menu or a navigation
+            current_model = self._model_text_cache
+            if current_model is None:
+                current_model = self.page.evaluate(_MODEL_TRIGGER_TEXT_JS)
+                self._model_text_cache = current_model
             logger.debug(f"Verifying model selection: expected '{model}', UI shows '{current_model}'")
             
-            # Map model names to what they should show in UI
-            if model_lower in ['grok-4.1', 'grok-4-1']:
-                # Grok 4.1 should show "Grok 4.1" in the button
-                return "grok 4.1" in current_model.lower() and "expert" not in current_model.lower()
-            elif model_lower in ['grok-4.1-think', 'grok-4-1-think', 'grok-4.1-thinking', 'grok-4-1-thinking']:
-                # Grok 4.1 Thinking should show "Grok 4.1 Thinking"
-                return "grok 4.1 thinking" in current_model.lower()
-            elif model_lower == 'expert':
-                # Expert should show "Expert" but not "Grok 4.1"
-                return "expert" in current_model.lower() and "grok 4.1" not in current_model.lower()
-            elif model_lower == 'fast':
-                return "fast" in current_model.lower()
-            elif model_lower == 'auto':
-                return "auto" in current_model.lower()
-            else:
-                # For other models, use simple substring match
-                return model_lower in current_model.lower()
+            return model_text_matches(model_lower, current_model.lower())
         except Exception as e:
             logger.debug(f"Could not verify model selection: {e}")
             return False
@@ -1113,91 +1051,112 @@ class GrokWebDriver:
             logger.info(f"🔒 [Private] {'Enabling' if enable else 'Disabling'} Private mode...")
             private_start = time.time()
             
-            # Step 1: Find the Private button
-            logger.debug("[Private] Looking for Private button...")
-            button_info = self.page.evaluate(find_private_button_js())
+            # Find, compare, click and wait for the new state in one round trip
+            result = evaluate_js_api(self.page, 'setPrivateMode', [enable, 1000]) or {}
             
-            if not button_info or not button_info.get('found'):
+            if not result.get('found'):
                 logger.warning("[Private] ✗ Private button not found")
                 return False
             
-            current_private = button_info.get('isPrivate', False)
-            logger.debug(f"[Private] Current state: {'Private' if current_private else 'Default'}")
-            
-            # Step 2: Check if we need to toggle
-            if (enable and current_private) or (not enable and not current_private):
-                logger.info(f"[Private] ✓ Already in {'Private' if enable else 'Default'} mode")
-                return True
-            
-            # Click the button to toggle using JavaScript
-            logger.debug("[Private] Clicking Private button to toggle...")
-            click_result = self.page.evaluate("""
-                () => {
-                    const selectors = [
-                        'a[aria-label*="Switch to Private Chat" i]',
-                        'a[aria-label*="Switch to Default Chat" i]',
-                        'button[aria-label*="Switch to Private Chat" i]',
-                        'button[aria-label*="Switch to Default Chat" i]',
-                        'a[href*="#private"]',
-                    ];
-                    
-                    for (const selector of selectors) {
-                        const elements = Array.from(document.querySelectorAll(selector));
-                        for (const el of elements) {
-                            const text = (el.innerText || el.textContent || '').trim();
-                            if (text === 'Private' || text.toLowerCase() === 'private') {
-                                const rect = el.getBoundingClientRect();
-                                if (rect.width > 0 && rect.height > 0) {
-                                    el.scrollIntoView({ behavior: 'instant', block: 'center' });
-                                    el.click();
-                                    return { clicked: true };
-                                }
-                            }
-                        }
-                    }
-                    return { clicked: false };
-                }
-            """)
-            
-            if not (click_result and click_result.get('clicked')):
+            if not result.get('clicked'):
+                if result.get('ok'):
+                    logger.info(f"[Private] ✓ Already in {'Private' if enable else 'Default'} mode")
+                    return True
                 logger.warning("[Private] ✗ Could not click Private button")
                 return False
             
-            logger.info("[Private] ✓ Clicked button")
-            
-            # Step 4: Wait for UI to update
-            time.sleep(0.3)  # OPTIMIZED: Reduced from 0.5s to 0.3s
+            if result.get('ok'):
+                private_time = time.time() - private_start
+                logger.info(f"[Private] ✓ Private mode {'enabled' if enable else 'disabled'} successfully (took {private_time:.2f}s)")
+                return True
             
-            # Step 5: Verify the state changed
-            verification = self.page.evaluate(verify_private_mode_js())
-            if verification and verification.get('found'):
-                is_private = verification.get('isPrivate', False)
-                if (enable and is_private) or (not enable and not is_private):
-                    private_time = time.time() - private_start
-                    logger.info(f"[Private] ✓ Private mode {'enabled' if enable else 'disabled'} successfully (took {private_time:.2f}s)")
-                    return True
-                else:
-                    logger.warning(f"[Private] ⚠ State verification failed - expected {'Private' if enable else 'Default'}, got {'Private' if is_private else 'Default'}")
-                    # Retry verification after a bit more wait
-                    time.sleep(0.3)  # Trimmed from 0.5s
-                    verification = self.page.evaluate(verify_private_mode_js())
-                    if verification:
-                        is_private = verification.get('isPrivate', False)
-                        if (enable and is_private) or (not enable and not is_private):
-                            logger.info("[Private] ✓ Private mode set (verified on retry)")
-                            return True
-                    return False
+            # Report the state it ended up in
+            if result.get('verified'):
+                is_private = result.get('isPrivate', False)
+                logger.warning(f"[Private] ⚠ State verification failed - expected {'Private' if enable else 'Default'}, got {'Private' if is_private else 'Default'}")
             else:
                 logger.warning("[Private] ⚠ Could not verify private mode state")
-                return False
+            return False
                 
         except Exception as e:
             logger.error(f"[Private] ✗ Error setting private mode: {e}")
             if self.debug_mode:
-                import traceback
                 logger.debug(f"[Private] Traceback: {traceback.format_exc()}")
             return False
 
+    def configure_session(
+        self,
+        model: Optional[str] = None,
+        deepsearch: bool = False,
+        private: bool = False
+    ) -> Dict[str, bool]:
+        """
+        Apply model, DeepSearch and Private mode settings in one pass.
+        
+        The current state of all three is read with a single evaluate; only the
+        settings that differ are clicked. This also keeps an already enabled
+        DeepSearch toggle from being clicked off.
+        
+        Args:
+            model: Model name for set_model(), or None to leave it
+            deepsearch: Enable DeepSearch
+            private: Enable Private mode
+        
+        Returns:
+            Dictionary of setting name -> whether it is in effect
+        """
+        if not self.page:
+            logger.warning("⚠ Cannot configure session: page not available")
+            return {}
+        
+        try:
+            state = evaluate_js_api(self.page, 'sessionState') or {}
+        except Exception as e:
+            logger.debug(f"Could not read session state: {e}")
+            state = {}
+        
+        results: Dict[str, bool] = {}
+        if model:
+            model_lower = model.lower().strip()
+            if model_text_matches(model_lower, (state.get('modelText') or '').lower()):
+                logger.debug(f"Model already set to {model_lower}")
+                self._current_model_cache = model_lower
+                results['model'] = True
+            else:
+                results['model'] = self.set_model(model)
+        
+        if deepsearch:
+            if (state.get('deepsearch') or {}).get('enabled'):
+                logger.debug("[DeepSearch] Already enabled")
+                results['deepsearch'] = True
+            else:
+                results['deepsearch'] = self.enable_deepsearch()
+        
+        if private:
+            private_state = state.get('private') or {}
+            if private_state.get('found') and private_state.get('isPrivate'):
+                logger.debug("[Private] Already in Private mode")
+                results['private'] = True
+            else:
+                results['private'] = self.set_private_mode(enable=True)
+        
+        return results
+
+    def _get_chat_input(self) -> Optional[Any]:
+        """Return the chat input of self.page, re-querying only when the cached handle is gone"""
+        if not self.page:
+            return None
+        handle = self._chat_input_handle
+        if handle is not None:
+            try:
+                if handle.is_visible():
+                    return handle
+            except Exception:
+                pass  # Detached by a re-render or navigation
+        handle = self.page.query_selector(CHAT_INPUT_SELECTOR)
+        self._chat_input_handle = handle
+        return handle
+
     def enter_message(self, message: str) -> bool:
         """
         Enter a message into the chat input without sending it.
@@ -1215,14 +1174,8 @@ class GrokWebDriver:
         try:
             logger.debug("🔍 Looking for chat input...")
             
-            # Find chat input - simplified, no unnecessary waits
-            chat_input = self.page.query_selector('textarea[aria-label*="Ask Grok"], textarea[aria-label*="Ask"], input[aria-label*="Ask Grok"]')
-            
-            if not chat_input:
-                chat_input = self.page.query_selector('textarea')
-            
-            if not chat_input:
-                chat_input = self.page.query_selector('[contenteditable="true"]')
+            # Find chat input - cached handle or one selector list, no unnecessary waits
+            chat_input = self._get_chat_input()
             
             if not chat_input:
                 logger.warning("⚠ Could not find chat input")
@@ -1242,7 +1195,6 @@ class GrokWebDriver:
         except Exception as e:
             logger.error(f"✗ Error entering message: {e}")
             if self.debug_mode:
-                import traceback
                 logger.debug(f"Traceback: {traceback.format_exc()}")
             return False
 
@@ -1267,15 +1219,9 @@ class GrokWebDriver:
         if not self.page:
             raise Exception("Browser not started")
 
-        # Find chat input - simplified
-        chat_input = self.page.query_selector('textarea[aria-label*="Ask Grok"], textarea[aria-label*="Ask"], input[aria-label*="Ask Grok"]')
-        
-        if not chat_input:
-            chat_input = self.page.query_selector('textarea')
+        # Find chat input - cached handle or one selector list
+        chat_input = self._get_chat_input()
         
-        if not chat_input:
-            chat_input = self.page.query_selector('[contenteditable="true"]')
-            
         if not chat_input:
             raise Exception("Could not find chat input. Make sure you're logged in and on the chat page.")
 
@@ -1303,6 +1249,46 @@ class GrokWebDriver:
         # Wait for response
         return self._wait_for_response(timeout, user_message=message or "")
 
+    def _wait_for_stop_button(self, visible: bool, deadline: float) -> bool:
+        """
+        Wait until the stop generation button is visible (or gone).
+        
+        Playwright watches the DOM in the page and answers once; with
+        poll_response the page is polled with exponential backoff instead.
+        
+        Args:
+            visible: True to wait for the button to appear, False for it to go away
+            deadline: time.time() value after which to give up
+        
+        Returns:
+            True if the button reached that state before the deadline
+        """
+        if self.poll_response:
+            # Back off from 100ms to 2s between checks; each call starts fast
+            # again, so the disappearance wait is responsive after the button shows
+            interval = 0.1
+            while True:
+                if bool(evaluate_js_api(self.page, 'detectStopButton')) == visible:
+                    return True
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(interval, remaining))
+                interval = min(interval * 2, _STOP_BUTTON_POLL_MAX_INTERVAL)
+        
+        remaining_ms = (deadline - time.time()) * 1000
+        if remaining_ms <= 0:
+            return False
+        try:
+            self.page.wait_for_selector(
+                STOP_BUTTON_SELECTOR,
+                state="visible" if visible else "hidden",
+                timeout=remaining_ms,
+            )
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
     def _wait_for_response(self, timeout: int = 120000, user_message: str = "") -> Optional[str]:
         """
         Wait for chat response using the stop generation button as indicator.
@@ -1312,117 +1298,35 @@ class GrokWebDriver:
             return None
 
         start_time = time.time()
-        timeout_seconds = timeout / 1000
+        deadline = start_time + timeout / 1000
         
-        # Button selector - this is the stop generation button that appears during response generation
-        # Using class list matching since CSS selectors with spaces need special handling
         logger.debug("🔍 Waiting for response generation to complete...")
         
         try:
             # Step 1: Wait for the button to appear (generation started)
             button_appear_start = time.time()
             logger.debug("Waiting for generation button to appear...")
-            button_appeared = False
-            for i in range(int(timeout_seconds * 2)):  # Check every 0.5s
-                if time.time() - start_time > timeout_seconds:
-                    break
-                    
-                button_exists = self.page.evaluate("""
-                    () => {
-                        // Look for the stop generation button by matching its classes
-                        const buttons = document.querySelectorAll('div');
-                        for (const btn of buttons) {
-                            const classList = btn.classList;
-                            if (classList.contains('h-10') && 
-                                classList.contains('aspect-square') && 
-                                classList.contains('flex') && 
-                                classList.contains('flex-col') && 
-                                classList.contains('items-center') && 
-                                classList.contains('justify-center') && 
-                                classList.contains('rounded-full') && 
-                                classList.contains('ring-1') && 
-                                classList.contains('ring-inset') && 
-                                classList.contains('bg-button-filled') && 
-                                classList.contains('text-fg-invert')) {
-                                // Check if it's visible
-                                const rect = btn.getBoundingClientRect();
-                                const style = window.getComputedStyle(btn);
-                                if (rect.width > 0 && rect.height > 0 && 
-                                    btn.offsetParent !== null &&
-                                    style.display !== 'none' &&
-                                    style.visibility !== 'hidden') {
-                                    return true;
-                                }
-                            }
-                        }
-                        return false;
-                    }
-                """)
-                
-                if button_exists:
-                    button_appeared = True
-                    button_appear_time = time.time() - button_appear_start
-                    logger.debug(f"Generation button appeared - response is being generated (took {button_appear_time:.2f}s)")
-                    break
-                    
-                time.sleep(0.2)  # OPTIMIZED: Reduced from 0.3s to 0.2s for faster polling
-            
-            if not button_appeared:
+            button_appeared = self._wait_for_stop_button(True, deadline)
+            
+            if button_appeared:
+                button_appear_time = time.time() - button_appear_start
+                logger.debug("Generation button appeared - response is being generated (took %.2fs)", button_appear_time)
+            else:
                 button_appear_time = time.time() - button_appear_start
                 logger.warning(f"Generation button never appeared - response may have completed immediately (checked for {button_appear_time:.2f}s)")
             
             # Step 2: Wait for the button to disappear (generation complete)
             button_disappear_start = time.time()
             logger.debug("Waiting for generation button to disappear...")
-            button_disappeared = False
+            button_disappeared = self._wait_for_stop_button(False, deadline)
             
-            for i in range(int(timeout_seconds * 2)):  # Check every 0.5s
-                if time.time() - start_time > timeout_seconds:
-                    logger.warning("Timeout waiting for generation to complete")
-                    break
-                
-                button_exists = self.page.evaluate("""
-                    () => {
-                        // Look for the stop generation button by matching its classes
-                        const buttons = document.querySelectorAll('div');
-                        for (const btn of buttons) {
-                            const classList = btn.classList;
-                            if (classList.contains('h-10') && 
-                                classList.contains('aspect-square') && 
-                                classList.contains('flex') && 
-                                classList.contains('flex-col') && 
-                                classList.contains('items-center') && 
-                                classList.contains('justify-center') && 
-                                classList.contains('rounded-full') && 
-                                classList.contains('ring-1') && 
-                                classList.contains('ring-inset') && 
-                                classList.contains('bg-button-filled') && 
-                                classList.contains('text-fg-invert')) {
-                                // Check if it's visible
-                                const rect = btn.getBoundingClientRect();
-                                const style = window.getComputedStyle(btn);
-                                if (rect.width > 0 && rect.height > 0 && 
-                                    btn.offsetParent !== null &&
-                                    style.display !== 'none' &&
-                                    style.visibility !== 'hidden') {
-                                    return true;
-                                }
-                            }
-                        }
-                        return false;
-                    }
-                """)
-                
-                if not button_exists:
-                    button_disappeared = True
-                    button_disappear_time = time.time() - button_disappear_start
-                    logger.debug(f"Generation button disappeared - response complete (took {button_disappear_time:.2f}s)")
-                    break
-                    
-                time.sleep(0.2)  # OPTIMIZED: Reduced from 0.3s to 0.2s for faster polling
-            
-            if not button_disappeared and button_appeared:
-                logger.warning("Generation button still visible - may still be generating")
+            if button_disappeared:
+                button_disappear_time = time.time() - button_disappear_start
+                logger.debug("Generation button disappeared - response complete (took %.2fs)", button_disappear_time)
+            else:
+                logger.warning("Timeout waiting for generation to complete")
+                if button_appeared:
+                    logger.warning("Generation button still visible - may still be generating")
             
             # Step 3: OPTIMIZED: Minimal wait for DOM to settle after button disappears
             # Reduced from 0.5s to 0.2s - response should be ready immediately after button disappears
@@ -1430,73 +1334,18 @@ class GrokWebDriver:
             
             # Step 4: Extract response immediately (target: <0.5s)
             extract_start = time.time()
-            response_text = self.page.evaluate("""
-                () => {
-                    // Find the main chat container first
-                    const main = document.querySelector('main');
-                    if (!main) return '';
-                    
-                    // Look for markdown/prose content (Grok responses are usually in markdown)
-                    const markdownContainers = main.querySelectorAll('div[class*="markdown"], pre[class*="markdown"], [class*="prose"]');
-                    let bestText = '';
-                    
-                    for (const md of markdownContainers) {
-                        const isInInput = md.closest('form, textarea, [contenteditable="true"]');
-                        if (isInInput) continue;
-                        
-                        const text = (md.innerText || md.textContent || '').trim();
-                        if (text.length > 50 && !text.includes('What do you want to know?') && text.length > bestText.length) {
-                            bestText = text;
-                        }
-                    }
-                    
-                    if (bestText) return bestText;
-                    
-                    // Fallback: Look for article/role containers
-                    const articles = main.querySelectorAll('[role="article"], article');
-                    const uiTexts = ['Private', 'Auto', 'DeepSearch', 'Create Image', 'Pick Personas', 'Voice', 'What do you want to know?'];
-                    
-                    for (const article of articles) {
-                        const isInInput = article.closest('form, textarea');
-                        if (isInInput) continue;
-                        
-                        const text = (article.innerText || article.textContent || '').trim();
-                        const isUIText = uiTexts.some(ui => text.includes(ui));
-                        if (text.length > 50 && !isUIText && text.length > bestText.length) {
-                            bestText = text;
-                        }
-                    }
-                    
-                    return bestText;
-                }
-            """)
+            response_text = evaluate_js_api(self.page, 'extractResponse')
             
             extract_time = time.time() - extract_start
             if extract_time > 0.5:
                 logger.warning(f"Response extraction took {extract_time:.2f}s (target: <0.5s)")
             
             # Filter out user's message
-            if response_text:
-                response_text_clean = response_text.strip()
-                user_msg_clean = user_message.strip() if user_message else ""
-                
-                # If the extracted text is very similar to the message we sent, it's probably not the response
-                if response_text_clean and response_text_clean != user_msg_clean:
-                    # Additional check: if it starts with the user message, it might be the user message
-                    if not response_text_clean.startswith(user_msg_clean[:50]) or len(response_text_clean) > len(user_msg_clean) * 1.5:
-                        result = response_text_clean
-                    else:
-                        logger.debug("Skipping - looks like user message")
-                        result = None
-                else:
-                    logger.debug("Skipping - extracted text matches user message")
-                    result = None
-            else:
-                result = None
+            result = filter_response_text(response_text, user_message)
             
             elapsed = time.time() - start_time
             if result:
-                logger.debug(f"✓ Response extracted ({len(result)} chars, took {elapsed:.1f}s)")
+                logger.debug("✓ Response extracted (%d chars, took %.1fs)", len(result), elapsed)
             else:
                 logger.warning(f"✗ No response extracted (took {elapsed:.1f}s)")
             
@@ -1511,84 +1360,64 @@ class GrokWebDriver:
         """Close browser and cleanup with proper error handling for headless mode"""
         errors = []
         
-        # Check if resources are already closed before attempting to close
-        try:
-            if self.page and not self.page.is_closed():
-                try:
-                    self.page.close()
-                except Exception as e:
-                    error_msg = str(e)
-                    # Ignore "Event loop is closed" errors - resource is already closed (common in headless mode)
-                    if "Event loop is closed" not in error_msg and "already stopped" not in error_msg.lower():
-                        errors.append(f"page: {e}")
-                        if self.debug_mode:  # Only log in debug mode
-                            logger.warning(f"Error closing page: {e}")
-        except Exception as e:
-            # Page might not have is_closed() method or already closed
-            pass
-        
-        try:
-            if self.context:
-                # Check if context is still valid before closing
-                try:
-                    # Try to access context to see if it's still valid
-                    _ = self.context.pages
-                    self.context.close()
-                except Exception as e:
-                    error_msg = str(e)
-                    # Ignore "Event loop is closed" errors - resource is already closed (common in headless mode)
-                    if "Event loop is closed" not in error_msg and "already stopped" not in error_msg.lower():
-                        errors.append(f"context: {e}")
-                        if self.debug_mode:  # Only log in debug mode
-                            logger.warning(f"Error closing context: {e}")
-        except Exception as e:
-            # Context might already be closed
-            pass
+        # Detach the debug listeners; on a reused CDP context the emitter may
+        # outlive this driver
+        for emitter, event, handler in self._network_listeners:
+            try:
+                emitter.remove_listener(event, handler)
+            except Exception:
+                pass
+        self._network_listeners = []
         
-        try:
-            if self.browser:
-                # Check if browser is still connected before closing
-                try:
-                    # Try to access browser to see if it's still valid
-                    _ = self.browser.contexts
-                    self.browser.close()
-                except Exception as e:
-                    error_msg = str(e)
-                    # Ignore "Event loop is closed" errors - resource is already closed (common in headless mode)
-                    if "Event loop is closed" not in error_msg and "already stopped" not in error_msg.lower():
-                        errors.append(f"browser: {e}")
-                        if self.debug_mode:  # Only log in debug mode
-                            logger.warning(f"Error closing browser: {e}")
-        except Exception as e:
-            # Browser might already be closed
-            pass
+        # Close the page and, unless it is a reused CDP context that belongs to
+        # the external Chrome, the context; closing an already closed one is a no-op
+        resources = [("page", self.page)]
+        if self._owns_context:
+            resources.append(("context", self.context))
+        for name, resource in resources:
+            if resource is None:
+                continue
+            try:
+                resource.close()
+            except Exception as e:
+                error_msg = str(e)
+                # Ignore "Event loop is closed" errors - resource is already closed (common in headless mode)
+                if "Event loop is closed" not in error_msg and "already stopped" not in error_msg.lower():
+                    errors.append(f"{name}: {e}")
+                    if self.debug_mode:  # Only log in debug mode
+                        logger.warning(f"Error closing {name}: {e}")
         
+        # The browser and Playwright belong to the pool; hand them back. On the
+        # main thread the browser stays open so the next driver skips the
+        # launch; a worker thread's browser closes with its last borrower
         try:
-            if self.playwright:
-                self.playwright.stop()
+            self._browser_pool.release(self.browser)
+            self._release_playwright()
         except Exception as e:
-            error_msg = str(e)
-            # Ignore "Event loop is closed" errors - Playwright is already stopped (common in headless mode)
-            if "Event loop is closed" not in error_msg and "already stopped" not in error_msg.lower():
-                errors.append(f"playwright: {e}")
-                if self.debug_mode:  # Only log in debug mode
-                    logger.warning(f"Error stopping playwright: {e}")
+            errors.append(f"browser: {e}")
+            if self.debug_mode:  # Only log in debug mode
+                logger.warning(f"Error releasing browser: {e}")
+        self.browser = None
+        self.playwright = None
         
         # Only log errors in debug mode, and suppress "Event loop is closed" warnings
         if errors and self.debug_mode:
-            filtered_errors = [e for e in errors if "Event loop is closed" not in str(e) and "already stopped" not in str(e).lower()]
-            if filtered_errors:
-                logger.debug(f"Cleanup completed with {len(filtered_errors)} error(s): {', '.join(filtered_errors)}")
+            logger.debug("Cleanup completed with %d error(s): %s", len(errors), ', '.join(errors))
 
     def interactive_mode(self) -> None:
-        """Keep browser open for interactive use"""
+        """Keep browser open for interactive use until the window is closed or Ctrl+C"""
         if not self.page:
             return
         
         logger.info("Browser open for interactive use. Press Ctrl+C to close.")
         try:
-            while True:
-                time.sleep(0.3)  # OPTIMIZED: Reduced from 0.5s to 0.3s
+            # Block until the user closes the tab/window instead of waking up
+            # every few hundred milliseconds; timeout=0 disables the timeout
+            self.page.wait_for_event("close", timeout=0)
+            logger.info("Browser window closed")
         except KeyboardInterrupt:
             logger.info("Closing browser...")
-            self.close()
+        except Exception as e:
+            # Browser disconnected (crash or killed) before the page closed
+            logger.debug(f"Interactive wait ended: {e}")
+        self.close()
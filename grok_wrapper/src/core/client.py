@@ -3,13 +3,26 @@ Grok Chat API Wrapper - Synchronous Client
 """
 import json
 import time
-from typing import Any, Dict, List, Optional, Generator, Union
+from typing import Any, Dict, Iterator, List, Optional, Generator, Union
 import requests
+from .json_codec import iter_ndjson
 from .models import (
     ChatRequest, ChatResponse, StreamingToken,
     GrokException, AuthenticationError, NetworkError, APIError
 )
 
+# httpx with the h2 package: one multiplexed HTTP/2 connection for all requests
+HTTPX_AVAILABLE = False
+try:
+    import httpx
+    import h2  # noqa: F401  (required by httpx for http2=True)
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# Connection pool limits for the httpx client
+_HTTPX_LIMITS = {"max_connections": 100, "max_keepalive_connections": 50}
+
 
 class GrokClient:
     """
@@ -28,7 +41,8 @@ class GrokClient:
         timeout: int = 120,
         max_retries: int = 3,
         user_agent: Optional[str] = None,
-        headers: Optional[Dict[str, str]] = None
+        headers: Optional[Dict[str, str]] = None,
+        http2: bool = False
     ):
         """
         Initialize Grok client
@@ -40,11 +54,24 @@ class GrokClient:
             max_retries: Maximum retry attempts
             user_agent: Custom user agent string
             headers: Custom headers dictionary (will be merged with defaults)
+            http2: Opt in to an HTTP/2 httpx client (pip install grok-wrapper[http2]);
+                   requests.Session is used by default or when httpx/h2 are missing
         """
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
         self.max_retries = max_retries
-        self.session = requests.Session()
+        self._use_httpx = http2 and HTTPX_AVAILABLE
+        self.session: Any
+        if self._use_httpx:
+            self.session = httpx.Client(
+                http2=True,
+                timeout=httpx.Timeout(timeout),
+                limits=httpx.Limits(**_HTTPX_LIMITS),
+            )
+            self._network_errors: tuple = (httpx.TransportError,)
+        else:
+            self.session = requests.Session()
+            self._network_errors = (requests.exceptions.RequestException,)
         
         # Set default headers
         default_user_agent = (
@@ -85,8 +112,7 @@ class GrokClient:
         
         # Set cookies if provided
         if cookies:
-            for name, value in cookies.items():
-                self.session.cookies.set(name, value, domain='.grok.com')
+            self.set_cookies(cookies)
     
     def get_cookies(self) -> Dict[str, str]:
         """Get current cookies as dictionary"""
@@ -97,24 +123,39 @@ class GrokClient:
         for name, value in cookies.items():
             self.session.cookies.set(name, value, domain='.grok.com')
     
+    def _send(
+        self,
+        method: str,
+        url: str,
+        stream: bool = False,
+        body: Optional[bytes] = None,
+        **kwargs: Any
+    ) -> Any:
+        """Issue one request on the requests or httpx session (body: pre-encoded request body)"""
+        if not self._use_httpx:
+            return self.session.request(method, url, timeout=self.timeout, stream=stream, data=body, **kwargs)
+        request = self.session.build_request(method, url, content=body, **kwargs)
+        return self.session.send(request, stream=stream)
+    
+    def _iter_body(self, response: Any) -> Iterator[bytes]:
+        """Response body as raw byte chunks, handed over as they arrive"""
+        if self._use_httpx:
+            return response.iter_bytes()
+        return response.iter_content(chunk_size=None)
+    
     def _request(
         self,
         method: str,
         endpoint: str,
         **kwargs: Any
-    ) -> requests.Response:
+    ) -> Any:
         """Make HTTP request with error handling"""
         url = f"{self.base_url}{endpoint}"
         
         last_exception = None
         for attempt in range(self.max_retries):
             try:
-                response = self.session.request(
-                    method,
-                    url,
-                    timeout=self.timeout,
-                    **kwargs
-                )
+                response = self._send(method, url, **kwargs)
                 
                 # Handle authentication errors
                 if response.status_code == 401:
@@ -124,6 +165,8 @@ class GrokClient:
                 
                 # Handle other errors
                 if response.status_code >= 400:
+                    if self._use_httpx:
+                        response.read()  # Streamed responses must be read before .json()
                     try:
                         error_data = response.json()
                     except (ValueError, json.JSONDecodeError):
@@ -137,7 +180,7 @@ class GrokClient:
                 
                 return response
                 
-            except requests.exceptions.RequestException as e:
+            except self._network_errors as e:
                 last_exception = e
                 if attempt < self.max_retries - 1:
                     time.sleep(2 ** attempt)
@@ -184,80 +227,60 @@ class GrokClient:
             **kwargs
         )
         
-        payload = request.to_dict()
+        # Encode once here (orjson when available) instead of letting the
+        # HTTP library run json.dumps on the dict
+        body = request.to_json_bytes()
         
         if stream:
-            return self._chat_stream(payload)
+            return self._chat_stream(body)
         else:
-            return self._chat_complete(payload)
+            return self._chat_complete(body)
     
-    def _chat_stream(self, payload: Dict[str, Any]) -> Generator[StreamingToken, None, None]:
+    def _chat_stream(self, body: bytes) -> Generator[StreamingToken, None, None]:
         """Stream chat response"""
-        response = self._request("POST", "/rest/app-chat/conversations/new", json=payload, stream=True)
+        response = self._request("POST", "/rest/app-chat/conversations/new", body=body, stream=True)
         
-        # Parse streaming newline-delimited JSON
-        for line in response.iter_lines():
-            if not line:
-                continue
-            
-            # Handle bytes
-            if isinstance(line, bytes):
-                line = line.decode('utf-8', errors='ignore')
-            
-            try:
-                data = json.loads(line)
-                
-                # Yield streaming token
-                token = StreamingToken.from_json(data)
-                if token:
-                    yield token
-                    
-            except json.JSONDecodeError:
-                continue
+        # Parse streaming newline-delimited JSON straight from the raw bytes
+        for data in iter_ndjson(self._iter_body(response)):
+            # Yield streaming token
+            token = StreamingToken.from_json(data)
+            if token:
+                yield token
     
-    def _chat_complete(self, payload: Dict[str, Any]) -> ChatResponse:
+    def _chat_complete(self, body: bytes) -> ChatResponse:
         """Get complete chat response (non-streaming)"""
-        response = self._request("POST", "/rest/app-chat/conversations/new", json=payload, stream=True)
+        response = self._request("POST", "/rest/app-chat/conversations/new", body=body, stream=True)
         
         conversation_id = None
-        final_message = ""
+        final_message_parts: List[str] = []
         final_metadata = None
         model_response = None
         
         # Collect all streaming data
-        for line in response.iter_lines():
-            if not line:
+        for data in iter_ndjson(self._iter_body(response)):
+            # Hot path: almost every line is {"result": {"response": {"token": ...}}}
+            try:
+                result = data["result"]
+                if "conversation" in result:
+                    conversation_id = result["conversation"].get("conversationId")
+                response_data = result["response"]
+            except (KeyError, TypeError, AttributeError):
+                continue
+            if not isinstance(response_data, dict):
                 continue
             
-            # Handle bytes
-            if isinstance(line, bytes):
-                line = line.decode('utf-8', errors='ignore')
+            # Collect tokens
+            token = response_data.get("token")
+            if token:
+                final_message_parts.append(token)
             
-            try:
-                data = json.loads(line)
-                
-                if "result" in data:
-                    if "conversation" in data["result"]:
-                        conversation_id = data["result"]["conversation"].get("conversationId")
-                    
-                    if "response" in data["result"]:
-                        response_data = data["result"]["response"]
-                        
-                        # Collect tokens
-                        token = response_data.get("token")
-                        if token:
-                            final_message += token
-                        
-                        # Check for final metadata
-                        if "finalMetadata" in response_data:
-                            final_metadata = response_data["finalMetadata"]
-                        
-                        # Check for model response
-                        if "modelResponse" in response_data:
-                            model_response = response_data["modelResponse"]
-                    
-            except json.JSONDecodeError:
-                continue
+            # Check for final metadata
+            if "finalMetadata" in response_data:
+                final_metadata = response_data["finalMetadata"]
+            
+            # Check for model response
+            if "modelResponse" in response_data:
+                model_response = response_data["modelResponse"]
         
         # Prefer model response if available
         if model_response:
@@ -268,7 +291,7 @@ class GrokClient:
         
         # Fallback to collected message
         return ChatResponse(
-            message=final_message.strip(),
+            message="".join(final_message_parts).strip(),
             conversation_id=conversation_id
         )
 
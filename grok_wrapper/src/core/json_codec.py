@@ -0,0 +1,97 @@
+"""
+JSON decoding for Grok's newline-delimited response streams
+Uses orjson when installed and falls back to the standard library
+"""
+import json
+from typing import Any, Iterable, Iterator, Union
+
+ORJSON_AVAILABLE = False
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+if ORJSON_AVAILABLE:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError
+    JSONDecodeError = orjson.JSONDecodeError
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+else:
+    JSONDecodeError = json.JSONDecodeError  # type: ignore
+    _loads = json.loads
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """
+    Parse one JSON document.
+
+    Args:
+        data: JSON text; bytes are parsed without decoding first when orjson is available
+
+    Returns:
+        Parsed value
+
+    Raises:
+        JSONDecodeError: If data is not valid JSON
+    """
+    return _loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON bytes, ready to send as a request body.
+
+    Args:
+        obj: JSON-serializable value
+
+    Returns:
+        Encoded JSON
+    """
+    return _dumps(obj)
+
+
+def iter_ndjson(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Parse newline-delimited JSON from raw byte chunks.
+
+    Lines are split on b'\\n' in a byte buffer, so a line split across chunks is
+    joined before parsing. Blank and malformed lines are skipped.
+
+    Args:
+        chunks: Byte chunks, e.g. response.iter_content(chunk_size=None)
+
+    Yields:
+        One parsed object per line
+    """
+    buffer = bytearray()
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer += chunk
+        start = 0
+        while True:
+            newline = buffer.find(b'\n', start)
+            if newline == -1:
+                break
+            # Both parsers take the bytearray slice as is, no bytes() copy
+            line = buffer[start:newline].strip()
+            start = newline + 1
+            if not line:
+                continue
+            try:
+                yield _loads(line)
+            except (JSONDecodeError, UnicodeDecodeError):
+                continue
+        del buffer[:start]
+
+    # Last line without a trailing newline
+    line = buffer.strip()
+    if line:
+        try:
+            yield _loads(line)
+        except (JSONDecodeError, UnicodeDecodeError):
+            pass
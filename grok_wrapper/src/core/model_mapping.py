@@ -1,6 +1,7 @@
 """
 Model name mapping for Grok UI models to API parameters
 """
+from functools import lru_cache
 from typing import Dict, Tuple, Optional
 
 # Mapping from UI model names to (model_name, model_mode) tuples
@@ -24,6 +25,9 @@ MODEL_MAPPING: Dict[str, Tuple[str, str]] = {
     "grok-beta": ("grok-beta", "MODEL_MODE_EXPERT"),
 }
 
+# Parameters for names not in MODEL_MAPPING
+_DEFAULT_PARAMS: Tuple[str, str] = ("grok-4", "MODEL_MODE_EXPERT")
+
 # UI model display names (for user-friendly output)
 MODEL_DISPLAY_NAMES: Dict[str, str] = {
     "auto": "Auto (Chooses Fast or Expert)",
@@ -41,6 +45,7 @@ MODEL_DISPLAY_NAMES: Dict[str, str] = {
 }
 
 
+@lru_cache(maxsize=64)
 def get_model_params(model: str) -> Tuple[str, str]:
     """
     Get API parameters for a model name
@@ -51,19 +56,14 @@ def get_model_params(model: str) -> Tuple[str, str]:
     Returns:
         Tuple of (model_name, model_mode)
     """
-    model_lower = model.lower().strip()
-    
-    if model_lower in MODEL_MAPPING:
-        return MODEL_MAPPING[model_lower]
-    
     # Default to grok-4 with expert mode
-    return ("grok-4", "MODEL_MODE_EXPERT")
+    return MODEL_MAPPING.get(model.lower().strip(), _DEFAULT_PARAMS)
 
 
+@lru_cache(maxsize=64)
 def get_model_display_name(model: str) -> str:
     """Get user-friendly display name for a model"""
-    model_lower = model.lower().strip()
-    return MODEL_DISPLAY_NAMES.get(model_lower, model)
+    return MODEL_DISPLAY_NAMES.get(model.lower().strip(), model)
 
 
 def list_available_models() -> list:
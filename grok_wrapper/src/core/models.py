@@ -4,6 +4,7 @@ Grok Chat API Wrapper - Data Models
 from enum import Enum
 from typing import Optional, List, Dict, Any
 from dataclasses import dataclass, field
+from .json_codec import dumps, loads
 
 
 class GrokModel(Enum):
@@ -80,6 +81,10 @@ class ChatRequest:
             "isAsyncChat": self.is_async_chat,
             "disableSelfHarmShortCircuit": self.disable_self_harm_short_circuit
         }
+    
+    def to_json_bytes(self) -> bytes:
+        """Encode the API request payload as compact UTF-8 JSON (orjson when installed)"""
+        return dumps(self.to_dict())
 
 
 @dataclass
@@ -110,6 +115,11 @@ class StreamingToken:
             raw_data=response
         )
         return token
+    
+    @classmethod
+    def from_json_bytes(cls, raw: bytes) -> Optional['StreamingToken']:
+        """Parse streaming token from one raw JSON line"""
+        return cls.from_json(loads(raw))
 
 
 @dataclass